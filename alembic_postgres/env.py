@@ -15,6 +15,13 @@ from dog_marker.database.base import Base  # noqa: 402
 
 target_metadata = Base.metadata
 
+# Created by the opt-in postgis branch and not part of the models
+POSTGIS_OBJECTS = {"spatial_ref_sys", "location", "ix_entries_location"}
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    return not (reflected and compare_to is None and name in POSTGIS_OBJECTS)
+
 
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
@@ -32,6 +39,7 @@ def run_migrations_offline() -> None:
     context.configure(
         url=url,
         target_metadata=target_metadata,
+        include_object=include_object,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
     )
@@ -54,7 +62,7 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, include_object=include_object)
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,60 @@
+"""Add: entries.geohash
+
+Revision ID: a3f1c9e2b7d4
+Revises: e7493efb103b
+Create Date: 2026-10-18 09:12:41.274190
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from dog_marker.dtypes import geohash
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a3f1c9e2b7d4"
+down_revision: Union[str, None] = "e7493efb103b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+
+
+def upgrade() -> None:
+    op.add_column("entries", sa.Column("geohash", sa.String(length=geohash.GEOHASH_PRECISION), nullable=True))
+
+    connection = op.get_bind()
+    entries = sa.table(
+        "entries",
+        sa.column("id", sa.UUID()),
+        sa.column("longitude", sa.Double()),
+        sa.column("latitude", sa.Double()),
+        sa.column("geohash", sa.String()),
+    )
+    update = (
+        entries.update().where(entries.c.id == sa.bindparam("entry_id")).values(geohash=sa.bindparam("new_geohash"))
+    )
+
+    # Keyset batches by id, only one batch of the table is in memory at a time
+    batch = sa.select(entries.c.id, entries.c.longitude, entries.c.latitude).order_by(entries.c.id).limit(BATCH_SIZE)
+    rows = connection.execute(batch).all()
+    while rows:
+        connection.execute(
+            update,
+            [
+                {"entry_id": entry_id, "new_geohash": geohash.encode(longitude, latitude)}
+                for entry_id, longitude, latitude in rows
+            ],
+        )
+        rows = connection.execute(batch.where(entries.c.id > rows[-1].id)).all()
+
+    op.alter_column("entries", "geohash", nullable=False)
+    op.create_index(op.f("ix_entries_geohash"), "entries", ["geohash"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_entries_geohash"), table_name="entries")
+    op.drop_column("entries", "geohash")
@@ -0,0 +1,36 @@
+"""Add: entries.location (PostGIS, opt-in)
+
+Revision ID: c5e8a2f7d913
+Revises:
+Create Date: 2026-10-18 15:02:17.518306
+
+Lives on its own branch, so the default head does not need PostGIS:
+    alembic upgrade postgis@head
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5e8a2f7d913"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = ("postgis",)
+depends_on: Union[str, Sequence[str], None] = "a3f1c9e2b7d4"
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+    # Generated from longitude and latitude, so every write keeps it in sync
+    op.execute(
+        "ALTER TABLE entries ADD COLUMN location geography(Point, 4326) "
+        "GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED"
+    )
+    op.execute("CREATE INDEX ix_entries_location ON entries USING gist (location)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX ix_entries_location")
+    op.execute("ALTER TABLE entries DROP COLUMN location")
@@ -0,0 +1,42 @@
+"""Add: primary key and category_key index to entries_categories_associations
+
+Revision ID: d4b8e1f3a6c2
+Revises: a3f1c9e2b7d4
+Create Date: 2026-10-18 16:21:53.804112
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d4b8e1f3a6c2"
+down_revision: Union[str, None] = "a3f1c9e2b7d4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Without a primary key the same link could be stored more than once
+    op.execute(
+        "DELETE FROM entries_categories_associations duplicate "
+        "USING entries_categories_associations original "
+        "WHERE duplicate.ctid > original.ctid "
+        "AND duplicate.item_id = original.item_id AND duplicate.category_key = original.category_key"
+    )
+    op.create_primary_key(
+        op.f("pk_entries_categories_associations"), "entries_categories_associations", ["item_id", "category_key"]
+    )
+    op.create_index(
+        op.f("ix_entries_categories_associations_category_key"),
+        "entries_categories_associations",
+        ["category_key", "item_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_entries_categories_associations_category_key"), table_name="entries_categories_associations")
+    op.drop_constraint(op.f("pk_entries_categories_associations"), "entries_categories_associations", type_="primary")
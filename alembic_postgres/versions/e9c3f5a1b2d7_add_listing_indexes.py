@@ -0,0 +1,51 @@
+"""Add: partial indexes on live entries, hidden_entries (user_id, entry_id) and entry_images (entry_id, id)
+
+Revision ID: e9c3f5a1b2d7
+Revises: d4b8e1f3a6c2
+Create Date: 2026-10-18 17:05:38.419527
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e9c3f5a1b2d7"
+down_revision: Union[str, None] = "d4b8e1f3a6c2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE_ENTRIES = sa.text("mark_to_delete IS NULL")
+
+
+def upgrade() -> None:
+    op.create_index(
+        "ix_entries_live_update_date", "entries", ["update_date", "id"], unique=False, postgresql_where=LIVE_ENTRIES
+    )
+    op.create_index(
+        "ix_entries_live_user_id",
+        "entries",
+        ["user_id", "update_date", "id"],
+        unique=False,
+        postgresql_where=LIVE_ENTRIES,
+    )
+    op.create_index(
+        "ix_entries_live_warning_level",
+        "entries",
+        ["warning_level", "update_date"],
+        unique=False,
+        postgresql_where=LIVE_ENTRIES,
+    )
+    op.create_index("ix_hidden_entries_user_id_entry_id", "hidden_entries", ["user_id", "entry_id"], unique=False)
+    op.create_index("ix_entry_images_entry_id", "entry_images", ["entry_id", "id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_entry_images_entry_id", table_name="entry_images")
+    op.drop_index("ix_hidden_entries_user_id_entry_id", table_name="hidden_entries")
+    op.drop_index("ix_entries_live_warning_level", table_name="entries")
+    op.drop_index("ix_entries_live_user_id", table_name="entries")
+    op.drop_index("ix_entries_live_update_date", table_name="entries")
@@ -0,0 +1,57 @@
+"""Add: entries.owner_deleted_at, part of the partial indexes of the live entries
+
+Revision ID: f2a7c4d9e1b3
+Revises: e9c3f5a1b2d7
+Create Date: 2026-10-18 18:21:07.530614
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f2a7c4d9e1b3"
+down_revision: Union[str, None] = "e9c3f5a1b2d7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIVE_INDEXES = {
+    "ix_entries_live_update_date": ["update_date", "id"],
+    "ix_entries_live_user_id": ["user_id", "update_date", "id"],
+    "ix_entries_live_warning_level": ["warning_level", "update_date"],
+}
+
+
+def create_live_indexes(where: str) -> None:
+    for name, columns in LIVE_INDEXES.items():
+        op.drop_index(name, table_name="entries")
+        op.create_index(name, "entries", columns, unique=False, postgresql_where=sa.text(where))
+
+
+def upgrade() -> None:
+    op.add_column("entries", sa.Column("owner_deleted_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute(
+        """
+        UPDATE entries SET owner_deleted_at = hidden_entries.update_date
+        FROM hidden_entries
+        WHERE hidden_entries.entry_id = entries.id AND hidden_entries.user_id = entries.user_id
+        """
+    )
+
+    create_live_indexes("mark_to_delete IS NULL AND owner_deleted_at IS NULL")
+    op.create_index(
+        "ix_entries_owner_deleted_at",
+        "entries",
+        ["owner_deleted_at"],
+        unique=False,
+        postgresql_where=sa.text("owner_deleted_at IS NOT NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_entries_owner_deleted_at", table_name="entries")
+    create_live_indexes("mark_to_delete IS NULL")
+    op.drop_column("entries", "owner_deleted_at")
@@ -0,0 +1,60 @@
+"""Time of ORDER BY distance LIMIT 100 with the registered SQLite haversine() and the inline expression.
+
+Usage: PYTHONPATH=src python benchmarks/distance_ordering.py [entries] [database_url]
+"""
+
+import random
+import sys
+import time
+
+from sqlalchemy import func, select
+
+from dog_marker.configs import Config
+from dog_marker.database.base import create_db
+from dog_marker.database.functions import haversine_expression
+from dog_marker.database.models import EntryDbModel
+from nearby_search import populate
+
+RUNS = 10
+
+
+def measure(session, distance, coordinates) -> float:
+    start = time.perf_counter()
+    for longitude, latitude in coordinates:
+        statement = (
+            select(EntryDbModel.id)
+            .order_by(distance(EntryDbModel.latitude, EntryDbModel.longitude, latitude, longitude))
+            .limit(100)
+        )
+        session.execute(statement).all()
+    return (time.perf_counter() - start) / len(coordinates) * 1000
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    config = Config()
+    config.DATABASE_URL = sys.argv[2] if len(sys.argv) > 2 else "sqlite:///./benchmark.db"
+    config.CREATE_DB = True
+    session_local = create_db(config)
+
+    with session_local() as session:
+        existing = session.query(func.count(EntryDbModel.id)).scalar()
+        if existing < entries:
+            populate(session, entries - existing)
+        total = session.query(func.count(EntryDbModel.id)).scalar()
+
+        coordinates = [(random.uniform(6.0, 16.0), random.uniform(46.0, 54.0)) for _ in range(RUNS)]
+
+        # Warm up the page cache so neither variant pays for reading the table from disk
+        measure(session, haversine_expression, coordinates[:1])
+
+        dialect = session.bind.dialect.name
+        print(f"{dialect}, {total} entries, {RUNS} queries each")
+        if dialect == "sqlite":
+            print(f"haversine():  {measure(session, func.haversine, coordinates):9.2f} ms/query")
+        print(f"expression:   {measure(session, haversine_expression, coordinates):9.2f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Size and encode/decode time of a page of entries in each media type of negotiate_entry_list_response.
+
+The page is the one get_all_entries sends for a map viewport, 100 and 1000 entries with
+category_infos and vgy.me urls. Sizes are given as they are and compressed like the
+CompressionMiddleware does, decoding is what a client does with json / msgpack.
+
+Usage: PYTHONPATH=src python benchmarks/entry_list_formats.py
+"""
+
+import datetime
+import json
+import time
+import uuid
+import zlib
+
+import brotli
+import msgpack
+
+from dog_marker.api.v1.endpoints.dependecies.entry_list_format import ENTRY_LIST_MEDIA_TYPES
+from dog_marker.api.v1.schemas import EntrySchema, EntryColumnsSchema
+from dog_marker.database.schemas import Category, EntryRow
+from dog_marker.middlewares import BROTLI_QUALITY, GZIP_LEVEL
+
+CATEGORIES = [
+    Category(key="poison", title="Poison bait", description="Poisoned bait laid out for dogs"),
+    Category(key="glass", title="Broken glass", description="Shards of glass on the ground"),
+    Category(key="ticks", title="Ticks", description="Many ticks in the area"),
+]
+
+
+def page(count: int) -> list[dict]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = [
+        EntryRow(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            title=f"Entry {i}",
+            description="Broken glass next to the playground",
+            image_path=f"https://vgy.me/u/{uuid.uuid4().hex[:6]}.png",
+            image_delete_url=None,
+            longitude=16.37 + i / 1000,
+            latitude=48.2 + i / 1000,
+            warning_level=i % 3,
+            create_date=now,
+            update_date=now,
+            is_deleted=False,
+            categories=tuple(CATEGORIES[: 1 + i % 3]),
+        )
+        for i in range(count)
+    ]
+    return [EntrySchema.dump_row(row) for row in rows]
+
+
+def measure(fn, repeat: int) -> float:
+    fn()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    for count in (100, 1000):
+        entries = page(count)
+        repeat = max(1, 20_000 // count)
+        print(f"{count} entries: bytes, gzip {GZIP_LEVEL}, br {BROTLI_QUALITY}, encode ms, decode ms")
+        for media_type, (response_class, columns) in ENTRY_LIST_MEDIA_TYPES.items():
+            decode = msgpack.unpackb if media_type.endswith("msgpack") else json.loads
+
+            def encode():
+                return response_class(EntryColumnsSchema.dump_entries(entries) if columns else entries).body
+
+            body = encode()
+            gzip = len(zlib.compress(body, GZIP_LEVEL, 31))
+            br = len(brotli.compress(body, quality=BROTLI_QUALITY))
+            print(
+                f"  {media_type:<43} {len(body):>7} {gzip:>6} {br:>6}"
+                f" {measure(encode, repeat):7.3f} {measure(lambda: decode(body), repeat):7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Cost of turning a page of EntryRow into the JSON body of a listing, validated and trusted.
+
+"validated" is the path before TrustedJSONResponse: EntrySchema is validated per row, FastAPI
+validates the list against the response_model again and encodes it with jsonable_encoder and
+json.dumps. "dump_json" is the same validation with pydantic writing the JSON, like newer
+FastAPI versions do. "trusted" dumps the rows to dicts (EntrySchema.dump_row) and writes them
+with TrustedJSONResponse.
+
+Usage: PYTHONPATH=src python benchmarks/entry_serialization.py
+"""
+
+import datetime
+import json
+import time
+import uuid
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from dog_marker.api.v1.responses import TrustedJSONResponse
+from dog_marker.api.v1.schemas import CategorySchema, EntrySchema
+from dog_marker.database.schemas import Category, EntryRow, WarningLevel
+
+CATEGORIES = tuple(Category(key=key, title=key.title(), description=None) for key in ("poison", "glass"))
+
+response_adapter = TypeAdapter(list[EntrySchema])
+
+
+def rows(count: int) -> list[EntryRow]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return [
+        EntryRow(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            title=f"Entry {i}",
+            description="Broken glass next to the playground",
+            image_path=f"https://vgy.me/{i}.png",
+            image_delete_url=f"https://vgy.me/delete/{i}",
+            longitude=16.37 + i / 100_000,
+            latitude=48.2,
+            warning_level=i % 3,
+            create_date=now,
+            update_date=now,
+            is_deleted=False,
+            categories=CATEGORIES[: i % 3],
+        )
+        for i in range(count)
+    ]
+
+
+def validated_schema(entry: EntryRow) -> EntrySchema:
+    return EntrySchema(
+        id=entry.id,
+        title=entry.title,
+        description=entry.description,
+        image_path=entry.image_path,  # type: ignore[arg-type]
+        image_delete_url=None,
+        longitude=entry.longitude,
+        latitude=entry.latitude,
+        warning_level=WarningLevel(entry.warning_level or 0).to_literal(),
+        categories=[category.key for category in entry.categories],
+        category_infos=[CategorySchema.from_db(category) for category in entry.categories],
+        create_date=entry.create_date,
+        update_date=entry.update_date,
+        is_deleted=entry.is_deleted,
+    )
+
+
+def validated(entries: list[EntryRow]) -> bytes:
+    schemas = response_adapter.validate_python([validated_schema(entry) for entry in entries])
+    return json.dumps(jsonable_encoder(schemas), separators=(",", ":")).encode()
+
+
+def dump_json(entries: list[EntryRow]) -> bytes:
+    schemas = response_adapter.validate_python([validated_schema(entry) for entry in entries])
+    return response_adapter.dump_json(schemas)
+
+
+def trusted(entries: list[EntryRow]) -> bytes:
+    return TrustedJSONResponse([EntrySchema.dump_row(entry) for entry in entries]).body
+
+
+def measure(fn, entries: list[EntryRow]) -> float:
+    repeat = max(1, 20_000 // len(entries))
+    fn(entries)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(entries)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    for count in (100, 10_000):
+        entries = rows(count)
+        assert json.loads(validated(entries)) == json.loads(trusted(entries))
+        for fn in (validated, dump_json, trusted):
+            print(f"{count:>6} entries {fn.__name__:<10} {measure(fn, entries):8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
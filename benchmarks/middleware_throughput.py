@@ -0,0 +1,61 @@
+"""Requests per second on /v1/categories/ through the whole middleware stack, in process over ASGI.
+
+Usage: PYTHONPATH=src python benchmarks/middleware_throughput.py [requests] [concurrency]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+from dog_marker import create_app
+from dog_marker.configs import Config
+from dog_marker.database.models import CategoryDbModel
+
+
+async def run(app, requests: int, concurrency: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def get():
+            async with semaphore:
+                response = await client.get("/v1/categories/")
+                assert response.status_code == 200
+
+        # Warm up the connection pool and the statement cache
+        await asyncio.gather(*(get() for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(get() for _ in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 3_000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = Config()
+        config.DATABASE_URL = f"sqlite:///{Path(directory) / 'benchmark.db'}"
+        config.CREATE_DB = True
+        app = create_app(config)
+
+        engine = create_engine(config.DATABASE_URL)
+        with engine.begin() as connection:
+            connection.execute(
+                insert(CategoryDbModel), [{"key": key, "title": key.title()} for key in ("poison", "glass", "ticks")]
+            )
+        engine.dispose()
+
+        for level in (1, concurrency):
+            requests_per_second = asyncio.run(run(app, requests, level))
+            print(f"concurrency {level:>3}: {requests_per_second:8.0f} requests/s on /v1/categories/")
+
+
+if __name__ == "__main__":
+    main()
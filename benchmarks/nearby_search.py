@@ -0,0 +1,85 @@
+"""Latency of GET /v1/entries nearby queries with and without max_distance_km.
+
+Usage: PYTHONPATH=src python benchmarks/nearby_search.py [entries] [database_url]
+"""
+
+import datetime
+import random
+import sys
+import time
+import uuid
+
+from sqlalchemy import func, insert
+
+from dog_marker.api.v1.services import EntryService
+from dog_marker.configs import Config
+from dog_marker.database.base import create_db
+from dog_marker.database.models import EntryDbModel
+from dog_marker.dtypes import geohash
+from dog_marker.dtypes.coordinate import Coordinate
+from dog_marker.dtypes.pagination import Pagination
+
+CHUNK_SIZE = 50_000
+RUNS = 20
+
+
+def populate(session, entries: int):
+    random.seed(42)
+    now = datetime.datetime.utcnow()
+    for offset in range(0, entries, CHUNK_SIZE):
+        rows = []
+        for i in range(min(CHUNK_SIZE, entries - offset)):
+            longitude = random.uniform(5.0, 17.0)
+            latitude = random.uniform(45.0, 55.0)
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "user_id": uuid.uuid4(),
+                    "title": f"Entry {offset + i}",
+                    "longitude": longitude,
+                    "latitude": latitude,
+                    "geohash": geohash.encode(longitude, latitude),
+                    "create_date": now,
+                    "update_date": now,
+                }
+            )
+        session.execute(insert(EntryDbModel), rows)
+    session.commit()
+
+
+def measure(service: EntryService, coordinates: list[Coordinate], max_distance_km: float | None) -> float:
+    page_info = Pagination(skip=0, limit=100)
+    start = time.perf_counter()
+    for coordinate in coordinates:
+        list(service.get_all(page_info=page_info, coordinate=coordinate, max_distance_km=max_distance_km))
+    return (time.perf_counter() - start) / len(coordinates) * 1000
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+
+    config = Config()
+    config.DATABASE_URL = sys.argv[2] if len(sys.argv) > 2 else "sqlite:///./benchmark.db"
+    config.CREATE_DB = True
+    session_local = create_db(config)
+
+    with session_local() as session:
+        existing = session.query(func.count(EntryDbModel.id)).scalar()
+        if existing < entries:
+            populate(session, entries - existing)
+
+        service = EntryService(session)
+        coordinates = [
+            Coordinate(longitude=random.uniform(6.0, 16.0), latitude=random.uniform(46.0, 54.0)) for _ in range(RUNS)
+        ]
+
+        print(f"{entries} entries, {RUNS} queries each, limit 100")
+        print(f"full sort:               {measure(service, coordinates, None):9.2f} ms/query")
+        for max_distance_km in (1, 5, 25):
+            print(
+                f"max_distance_km={max_distance_km:<7}  {measure(service, coordinates, max_distance_km):9.2f} ms/query"
+            )
+
+
+if __name__ == "__main__":
+    main()
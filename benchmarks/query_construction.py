@@ -0,0 +1,95 @@
+"""Python-side cost per request of building the get_all_entries statement, with and without the statement cache.
+
+"build" composes the closures of EntryService.get_all up to the projection and computes the
+SQLAlchemy cache key that every execution looks up its compiled form with. "uncached" clears
+the CachedStatement cache first, so every request builds its expression tree and cache key
+like an ad-hoc query. "request" runs the whole listing against a small database.
+
+Usage: PYTHONPATH=src python benchmarks/query_construction.py [requests]
+"""
+
+import datetime
+import sys
+import time
+import uuid
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from dog_marker.api.v1.schemas import CreateEntrySchema
+from dog_marker.api.v1.services import EntryService
+from dog_marker.database.base import Base
+from dog_marker.database.cached_statement import CachedStatement
+from dog_marker.database.cruds import EntryCRUD
+from dog_marker.database.functions import register_sqlite_functions
+from dog_marker.database.models import CategoryDbModel
+from dog_marker.dtypes.coordinate import Coordinate
+from dog_marker.dtypes.pagination import Pagination
+
+COORDINATE = Coordinate(longitude=16.37, latitude=48.2)
+
+
+def build(session):
+    entry_crud = EntryCRUD(session)
+    query = (
+        entry_crud.query()
+        .map(entry_crud.filter_marked_to_delete())
+        .map(entry_crud.filter_owner_deleted())
+        .map(entry_crud.filter_user_deleted(user_id=uuid.uuid4()))
+        .map(entry_crud.filter_by_date_from(datetime.datetime(2024, 1, 1)))
+        .map(entry_crud.filter_by_warning_level("information"))
+        .map(entry_crud.filter_by_categories(["poison"]))
+        .map(entry_crud.filter_by_distance(COORDINATE, 5))
+        .map(entry_crud.project())
+        .ok()
+    )
+    return query.statement._generate_cache_key()
+
+
+def request(session):
+    return EntryService(session).get_all(
+        page_info=Pagination(skip=0, limit=20),
+        user_id=uuid.uuid4(),
+        coordinate=COORDINATE,
+        date_from=datetime.datetime(2024, 1, 1),
+        max_distance_km=5,
+        categories=["poison"],
+    )
+
+
+def measure(session, fn, requests: int, cached: bool) -> float:
+    fn(session)
+    start = time.perf_counter()
+    for _ in range(requests):
+        if not cached:
+            CachedStatement.clear()
+        fn(session)
+    return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+
+    engine = create_engine("sqlite://")
+    event.listen(engine, "connect", register_sqlite_functions)
+    Base.metadata.create_all(engine)
+
+    with sessionmaker(bind=engine)() as session:
+        session.add(CategoryDbModel(key="poison", title="Poison"))
+        session.commit()
+        service = EntryService(session)
+        for i in range(50):
+            new_entry = CreateEntrySchema(
+                title=f"Entry {i}", longitude=16.37 + i / 1000, latitude=48.2, categories=["poison"]
+            )
+            service.create(uuid.uuid4(), new_entry)
+
+        print(f"{requests} requests of get_all_entries with categories and max_distance_km")
+        for name, fn in (("build", build), ("request", request)):
+            for cached in (False, True):
+                microseconds = measure(session, fn, requests, cached)
+                print(f"{name:<8} {'cached' if cached else 'uncached':<9} {microseconds:8.1f} us/request")
+
+
+if __name__ == "__main__":
+    main()
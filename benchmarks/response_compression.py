@@ -0,0 +1,135 @@
+"""Bytes on the wire and CPU per request of compressing a 100 entry page.
+
+The page is the body get_all_entries sends, entries with category_infos and vgy.me urls.
+The second part runs get_all_entries through the whole app over ASGI with each Accept-Encoding
+and measures the CPU time of the process per request, including the compression.
+
+Usage: PYTHONPATH=src python benchmarks/response_compression.py [requests]
+"""
+
+import asyncio
+import datetime
+import sys
+import tempfile
+import time
+import uuid
+import zlib
+from pathlib import Path
+
+import brotli
+import httpx
+from sqlalchemy import create_engine, insert
+
+from dog_marker import create_app
+from dog_marker.api.v1.responses import TrustedJSONResponse
+from dog_marker.api.v1.schemas import EntrySchema
+from dog_marker.configs import Config
+from dog_marker.database.models import CategoryDbModel
+from dog_marker.database.schemas import Category, EntryRow
+
+CATEGORIES = [
+    Category(key="poison", title="Poison bait", description="Poisoned bait laid out for dogs"),
+    Category(key="glass", title="Broken glass", description="Shards of glass on the ground"),
+    Category(key="ticks", title="Ticks", description="Many ticks in the area"),
+]
+
+
+def page(count: int = 100) -> bytes:
+    now = datetime.datetime.now(datetime.timezone.utc)
+    rows = [
+        EntryRow(
+            id=uuid.uuid4(),
+            user_id=uuid.uuid4(),
+            title=f"Entry {i}",
+            description="Broken glass next to the playground",
+            image_path=f"https://vgy.me/u/{uuid.uuid4().hex[:6]}.png",
+            image_delete_url=None,
+            longitude=16.37 + i / 1000,
+            latitude=48.2 + i / 1000,
+            warning_level=i % 3,
+            create_date=now,
+            update_date=now,
+            is_deleted=False,
+            categories=tuple(CATEGORIES[: 1 + i % 3]),
+        )
+        for i in range(count)
+    ]
+    return TrustedJSONResponse([EntrySchema.dump_row(row) for row in rows]).body
+
+
+COMPRESSORS = {
+    "gzip 1": lambda body: zlib.compress(body, 1, 31),
+    "gzip 5": lambda body: zlib.compress(body, 5, 31),
+    "gzip 6": lambda body: zlib.compress(body, 6, 31),
+    "gzip 9": lambda body: zlib.compress(body, 9, 31),
+    "br 1": lambda body: brotli.compress(body, quality=1),
+    "br 4": lambda body: brotli.compress(body, quality=4),
+    "br 5": lambda body: brotli.compress(body, quality=5),
+    "br 11": lambda body: brotli.compress(body, quality=11),
+}
+
+
+def measure(fn, body: bytes, repeat: int = 200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(body)
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+async def requests_per_encoding(app, requests: int) -> dict[str, tuple[int, float]]:
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+        for encoding in ("identity", "gzip", "br"):
+            headers = {"Accept-Encoding": encoding}
+            response = await client.get("/v1/entries/", params={"limit": 100}, headers=headers)
+            size = int(response.headers["content-length"])
+            start = time.process_time()
+            for _ in range(requests):
+                await client.get("/v1/entries/", params={"limit": 100}, headers=headers)
+            results[encoding] = (size, (time.process_time() - start) / requests * 1000)
+    return results
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+
+    body = page()
+    print(f"100 entries: {len(body)} bytes")
+    for name, fn in COMPRESSORS.items():
+        print(f"  {name:<7} {len(fn(body)):>7} bytes {measure(fn, body):8.0f} us")
+
+    with tempfile.TemporaryDirectory() as directory:
+        config = Config()
+        config.DATABASE_URL = f"sqlite:///{Path(directory) / 'benchmark.db'}"
+        config.CREATE_DB = True
+        app = create_app(config)
+
+        engine = create_engine(config.DATABASE_URL)
+        with engine.begin() as connection:
+            connection.execute(insert(CategoryDbModel), [category.model_dump() for category in CATEGORIES])
+        engine.dispose()
+
+        async def fill():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                for i in range(100):
+                    entry = {
+                        "title": f"Entry {i}",
+                        "description": "Broken glass next to the playground",
+                        "longitude": 16.37 + i / 1000,
+                        "latitude": 48.2 + i / 1000,
+                        "categories": [category.key for category in CATEGORIES[: 1 + i % 3]],
+                        "image_path": f"https://vgy.me/u/{uuid.uuid4().hex[:6]}.png",
+                        "image_delete_url": f"https://vgy.me/delete/{uuid.uuid4().hex}",
+                    }
+                    await client.post(f"/v1/user/{uuid.uuid4()}/entries", json=entry)
+
+        asyncio.run(fill())
+        print(f"get_all_entries with 100 entries, {requests} requests")
+        for encoding, (size, milliseconds) in asyncio.run(requests_per_encoding(app, requests)).items():
+            print(f"  {encoding:<8} {size:>7} bytes {milliseconds:6.2f} ms CPU/request")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,18 @@
 import functools
 from contextlib import asynccontextmanager
+from typing import Callable
 
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI
 from pytz import utc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
 
 from .configs import Config
 from .middlewares import register_middlewares
 from .tasks import register_background_tasks
-from .database.base import create_db
+from .database.base import create_db, create_async_db
 
 jobstores = {"default": MemoryJobStore()}
 
@@ -20,8 +23,11 @@ def create_app(config: Config = Config()) -> FastAPI:
     app = FastAPI(title="DogMarker - API", lifespan=functools.partial(lifespan, scheduler=scheduler))
 
     session_local = create_db(config)
+    request_session_local: Callable[[], Session | AsyncSession] = session_local
+    if config.ASYNC_DB:
+        request_session_local = create_async_db(config, session_local)
 
-    register_middlewares(app, config, session_local)
+    register_middlewares(app, config, request_session_local)
     register_background_tasks(app, config, scheduler, session_local)
 
     from .api.v1 import api_v1
@@ -3,7 +3,7 @@ __all__ = ["api_v1"]
 from fastapi import FastAPI, Request
 from fastapi.responses import JSONResponse
 
-from dog_marker.database.errors import DbNotFoundError
+from dog_marker.database.errors import DbNotFoundError, DbInvalidCursorError
 from .errors import NotAuthorizedError, EntityNotFound
 from .endpoints.entries import router as router_entries
 from .endpoints.user_entries import router as router_user_entries
@@ -33,3 +33,11 @@ async def db_not_found_exception_handler(request: Request, exc: DbNotFoundError
         status_code=404,
         content={"message": exc.msg},
     )
+
+
+@api_v1.exception_handler(DbInvalidCursorError)
+async def invalid_cursor_exception_handler(request: Request, exc: DbInvalidCursorError):
+    return JSONResponse(
+        status_code=418,
+        content={"message": exc.msg},
+    )
@@ -1,8 +1,26 @@
-__all__ = ["get_config", "get_db", "get_service", "query_coordinate", "query_pagination", "authenticate_app"]
+__all__ = [
+    "get_config",
+    "get_db",
+    "get_service",
+    "query_bounding_box",
+    "query_coordinate",
+    "query_max_distance",
+    "query_pagination",
+    "set_next_cursor",
+    "NEXT_CURSOR_HEADER",
+    "authenticate_app",
+    "negotiate_entry_list_response",
+    "ENTRY_LIST_RESPONSES",
+    "query_fields",
+    "query_entry_list_fields",
+]
 
 from .auth import authenticate_app
 from .config import get_config
 from .db import get_db
 from .service import get_service
-from .coordinate import query_coordinate
-from .pagination import query_pagination
+from .bounding_box import query_bounding_box
+from .coordinate import query_coordinate, query_max_distance
+from .pagination import query_pagination, set_next_cursor, NEXT_CURSOR_HEADER
+from .entry_list_format import negotiate_entry_list_response, query_entry_list_fields, ENTRY_LIST_RESPONSES
+from .fields import query_fields
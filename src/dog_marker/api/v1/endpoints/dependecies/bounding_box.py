@@ -0,0 +1,29 @@
+from fastapi import HTTPException
+from pydantic import ValidationError
+
+from dog_marker.dtypes.coordinate import BoundingBox
+
+
+def query_bounding_box(bbox: str) -> BoundingBox:
+    """Parses bbox=min_longitude,min_latitude,max_longitude,max_latitude"""
+    values = bbox.split(",")
+    if len(values) != 4:
+        raise HTTPException(
+            status_code=418, detail="bbox must be min_longitude,min_latitude,max_longitude,max_latitude"
+        )
+
+    try:
+        min_longitude, min_latitude, max_longitude, max_latitude = (float(value) for value in values)
+        bounding_box = BoundingBox(
+            min_longitude=min_longitude,
+            min_latitude=min_latitude,
+            max_longitude=max_longitude,
+            max_latitude=max_latitude,
+        )
+    except (ValueError, ValidationError):
+        raise HTTPException(status_code=418, detail="bbox contains invalid coordinates")
+
+    if bounding_box.min_latitude > bounding_box.max_latitude:
+        raise HTTPException(status_code=418, detail="bbox min_latitude must not be greater than max_latitude")
+
+    return bounding_box
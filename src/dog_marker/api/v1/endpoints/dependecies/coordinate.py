@@ -1,6 +1,6 @@
-from dog_marker.dtypes.coordinate import Longitude, Latitude, Coordinate
+from dog_marker.dtypes.coordinate import Longitude, Latitude, Coordinate, Distance
 
-from fastapi import HTTPException
+from fastapi import HTTPException, Depends
 
 
 def query_coordinate(longitude: Longitude | None = None, latitude: Latitude | None = None) -> Coordinate | None:
@@ -10,3 +10,13 @@ def query_coordinate(longitude: Longitude | None = None, latitude: Latitude | No
         return None
 
     raise HTTPException(status_code=418, detail="latitude and longitude must both set")
+
+
+def query_max_distance(
+    max_distance_km: Distance | None = None,
+    coordinate: Coordinate | None = Depends(query_coordinate),
+) -> Distance | None:
+    if max_distance_km is not None and coordinate is None:
+        raise HTTPException(status_code=418, detail="max_distance_km needs latitude and longitude")
+
+    return max_distance_km
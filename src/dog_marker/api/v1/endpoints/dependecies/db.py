@@ -1,6 +1,20 @@
+from typing import AsyncIterator
+
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Request
 
 
-def get_db(request: Request) -> Session:
-    return request.state.db
+async def get_db(request: Request) -> AsyncIterator[Session | AsyncSession]:
+    """The session of the request, only opened for routes that depend on it.
+
+    Closed after the response is sent, so streamed responses can still read from it.
+    """
+    db = request.state.session_local()
+    try:
+        yield db
+    finally:
+        if isinstance(db, AsyncSession):
+            await db.close()
+        else:
+            db.close()
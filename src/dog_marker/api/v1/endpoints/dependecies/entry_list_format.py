@@ -0,0 +1,90 @@
+from typing import Annotated, Any, Callable, Iterable
+
+from fastapi import Depends, Header, Response
+
+from dog_marker.dtypes.pagination import Page
+from ...responses import TrustedJSONResponse, MsgPackResponse
+from ...schemas import EntryColumnsSchema
+from .fields import query_fields
+from .pagination import set_next_cursor
+
+COLUMNS_JSON = "application/vnd.dog-marker.columns+json"
+COLUMNS_MSGPACK = "application/vnd.dog-marker.columns+msgpack"
+
+# Media type of an entry listing: the response writing it and whether the entries are sent as EntryColumnsSchema
+ENTRY_LIST_MEDIA_TYPES: dict[str, tuple[type[Response], bool]] = {
+    "application/json": (TrustedJSONResponse, False),
+    "application/msgpack": (MsgPackResponse, False),
+    COLUMNS_JSON: (TrustedJSONResponse, True),
+    COLUMNS_MSGPACK: (MsgPackResponse, True),
+}
+
+# OpenAPI responses of the endpoints using negotiate_entry_list_response, application/json is their response_model.
+# EntryColumnsSchema is no response_model, so its schema is inlined, the CategorySchema it refers to is a component.
+_COLUMNS_SCHEMA = EntryColumnsSchema.model_json_schema(ref_template="#/components/schemas/{model}")
+_COLUMNS_SCHEMA.pop("$defs", None)
+ENTRY_LIST_RESPONSES: dict[int | str, dict[str, Any]] = {
+    200: {
+        "content": {
+            "application/msgpack": {"schema": {"type": "array", "items": {"$ref": "#/components/schemas/EntrySchema"}}},
+            COLUMNS_JSON: {"schema": _COLUMNS_SCHEMA},
+            COLUMNS_MSGPACK: {"schema": _COLUMNS_SCHEMA},
+        }
+    }
+}
+
+
+def negotiate_media_type(accept: str | None, media_types: Iterable[str]) -> str:
+    """The media type of media_types with the highest quality in the Accept header, the first one by default."""
+    media_types = list(media_types)
+    accepted: list[tuple[float, str]] = []
+    for part in (accept or "").split(","):
+        media_type, *params = (value.strip() for value in part.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted.append((quality, media_type.lower()))
+
+    for quality, media_type in sorted(accepted, key=lambda item: -item[0]):
+        if quality <= 0:
+            break
+        if media_type in media_types:
+            return media_type
+        if media_type in ("*/*", "application/*"):
+            break
+    return media_types[0]
+
+
+def negotiate_entry_list_response(
+    accept: Annotated[str | None, Header()] = None,
+) -> Callable[[Page[dict[str, Any]]], Response]:
+    """Builds the response of a page of EntrySchema.dump_row dicts in the media type the client accepts.
+
+    JSON unless asked for MessagePack or the columns of EntryColumnsSchema, see ENTRY_LIST_MEDIA_TYPES.
+    The response varies by the Accept header, so caches keep one per media type.
+    """
+    response_class, columns = ENTRY_LIST_MEDIA_TYPES[negotiate_media_type(accept, ENTRY_LIST_MEDIA_TYPES)]
+
+    def __internal(entries: Page[dict[str, Any]]) -> Response:
+        response = response_class(EntryColumnsSchema.dump_entries(entries) if columns else entries)
+        set_next_cursor(response, entries)
+        response.headers.add_vary_header("Accept")
+        return response
+
+    return __internal
+
+
+def query_entry_list_fields(
+    accept: Annotated[str | None, Header()] = None,
+    fields: frozenset[str] | None = Depends(query_fields),
+) -> frozenset[str] | None:
+    """The sparse fieldset of an entry listing, the columns of EntryColumnsSchema are one of their own."""
+    _, columns = ENTRY_LIST_MEDIA_TYPES[negotiate_media_type(accept, ENTRY_LIST_MEDIA_TYPES)]
+    if columns:
+        return frozenset(EntryColumnsSchema.model_fields)
+    return fields
@@ -0,0 +1,17 @@
+from fastapi import HTTPException, Query
+
+from ...schemas import EntrySchema
+
+
+def query_fields(
+    fields: str | None = Query(None, description="Comma separated EntrySchema fields to return, e.g. id,latitude"),
+) -> frozenset[str] | None:
+    """The sparse fieldset of an entry endpoint, None for all fields of EntrySchema."""
+    if fields is None:
+        return None
+
+    requested = frozenset(field.strip() for field in fields.split(",") if field.strip())
+    unknown = requested.difference(EntrySchema.model_fields)
+    if not requested or unknown:
+        raise HTTPException(status_code=418, detail=f"fields must be fields of EntrySchema, unknown: {sorted(unknown)}")
+    return requested
@@ -1,5 +1,15 @@
-from dog_marker.dtypes.pagination import SkipInt, LimitInt, Pagination
+from fastapi import Response
 
+from dog_marker.dtypes.pagination import SkipInt, LimitInt, Pagination, Page
 
-def query_pagination(skip: SkipInt = 0, limit: LimitInt = 100) -> Pagination:
-    return Pagination(skip=skip, limit=limit)
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def query_pagination(skip: SkipInt = 0, limit: LimitInt = 100, cursor: str | None = None) -> Pagination:
+    return Pagination(skip=skip, limit=limit, cursor=cursor)
+
+
+def set_next_cursor(response: Response, page: Page) -> None:
+    """Passes the cursor of the next page to the client, the header is missing on the last page."""
+    if page.next_cursor is not None:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
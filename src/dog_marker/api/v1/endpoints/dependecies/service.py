@@ -1,6 +1,7 @@
 from typing import Callable, TypeVar
 
 from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from .db import get_db
@@ -8,8 +9,8 @@ from .db import get_db
 T = TypeVar("T")
 
 
-def get_service(service: Callable[[Session], T]) -> Callable[[], T]:
-    def helper(db: Session = Depends(get_db)) -> T:
+def get_service(service: Callable[[Session | AsyncSession], T]) -> Callable[[], T]:
+    def helper(db: Session | AsyncSession = Depends(get_db)) -> T:
         return service(db)
 
     return helper
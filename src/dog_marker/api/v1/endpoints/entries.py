@@ -1,42 +1,112 @@
 import datetime
-from typing import Optional
+from typing import Annotated, Any, Callable, Optional
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 
-from dog_marker.dtypes.coordinate import Coordinate
-from dog_marker.dtypes.pagination import Pagination
+from dog_marker.dtypes.coordinate import Coordinate, BoundingBox, Zoom
+from dog_marker.dtypes.pagination import Pagination, Page
 from dog_marker.database.schemas import warning_levels
-from .dependecies import get_service, query_coordinate, query_pagination
-from ..schemas import EntrySchema
+from .dependecies import (
+    get_service,
+    query_coordinate,
+    query_pagination,
+    query_max_distance,
+    query_bounding_box,
+    negotiate_entry_list_response,
+    query_entry_list_fields,
+    query_fields,
+    ENTRY_LIST_RESPONSES,
+)
+from ..responses import TrustedJSONResponse, NDJSONResponse
+from ..schemas import EntrySchema, EntryClusterSchema
 
-from ..services import EntryService
+from ..services import AsyncEntryService
 
 router = APIRouter()
 
 
-@router.get("/", response_model=list[EntrySchema], operation_id="get_all_entries")
+@router.get("/", response_model=list[EntrySchema], responses=ENTRY_LIST_RESPONSES, operation_id="get_all_entries")
 async def get_all_entries(
     user_id: UUID | None = None,
     page_info: Pagination = Depends(query_pagination),
     coordinate: Coordinate | None = Depends(query_coordinate),
+    max_distance_km: float | None = Depends(query_max_distance),
     date_from: datetime.datetime | None = None,
     warning_level: warning_levels = "information",
-    entry_service: EntryService = Depends(get_service(EntryService)),
+    categories: Annotated[list[str] | None, Query()] = None,
+    fields: frozenset[str] | None = Depends(query_entry_list_fields),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
+    entries_response: Callable[[Page[dict[str, Any]]], Response] = Depends(negotiate_entry_list_response),
 ):
-    entries = entry_service.get_all(
+    entries = await entry_service.get_all(
         page_info=page_info,
         user_id=user_id,
         coordinate=coordinate,
         date_from=date_from,
         warning_level=warning_level,
+        max_distance_km=max_distance_km,
+        categories=categories,
+        fields=fields,
     )
-    return entries
+    return entries_response(entries)
+
+
+@router.get("/export", response_class=NDJSONResponse, operation_id="export_entries")
+async def export_entries(
+    user_id: UUID | None = None,
+    coordinate: Coordinate | None = Depends(query_coordinate),
+    max_distance_km: float | None = Depends(query_max_distance),
+    date_from: datetime.datetime | None = None,
+    warning_level: warning_levels = "information",
+    categories: Annotated[list[str] | None, Query()] = None,
+    fields: frozenset[str] | None = Depends(query_fields),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
+):
+    """All entries of get_all_entries without pagination, as one JSON object per line ordered by id.
+
+    The entries are read and sent in batches, the CompressionMiddleware compresses them as they are sent.
+    """
+    batches = entry_service.export(
+        user_id=user_id,
+        coordinate=coordinate,
+        date_from=date_from,
+        warning_level=warning_level,
+        max_distance_km=max_distance_km,
+        categories=categories,
+        fields=fields,
+    )
+    return NDJSONResponse(batches)
+
+
+@router.get("/clusters", response_model=list[EntryClusterSchema], operation_id="get_entry_clusters")
+async def get_entry_clusters(
+    zoom: Zoom,
+    bounding_box: BoundingBox = Depends(query_bounding_box),
+    user_id: UUID | None = None,
+    date_from: datetime.datetime | None = None,
+    warning_level: warning_levels = "information",
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
+):
+    clusters = await entry_service.get_clusters(
+        bounding_box=bounding_box,
+        zoom=zoom,
+        user_id=user_id,
+        date_from=date_from,
+        warning_level=warning_level,
+    )
+    return clusters
 
 
 @router.get("/{entry_id}", response_model=Optional[EntrySchema], operation_id="get_entry")
 async def get_entry_by_id(
-    entry_id: UUID, user_id: UUID | None = None, entry_service: EntryService = Depends(get_service(EntryService))
+    entry_id: UUID,
+    user_id: UUID | None = None,
+    fields: frozenset[str] | None = Depends(query_fields),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
 ):
-    entry = entry_service.get(entry_id, user_id=user_id)
+    entry = await entry_service.get(entry_id, user_id=user_id, fields=fields)
+    if fields is not None:
+        # Only the fields, the response_model would ask for the others
+        return TrustedJSONResponse(entry)
     return entry
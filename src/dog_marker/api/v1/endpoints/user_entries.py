@@ -1,32 +1,50 @@
-from typing import Iterable
+from typing import Any, Callable, Iterable
 from uuid import UUID
 
 from fastapi import APIRouter, Depends, Response
 
-from dog_marker.dtypes.pagination import Pagination
+from dog_marker.dtypes.pagination import Pagination, Page
 from dog_marker.database.schemas import warning_levels
-from .dependecies import get_service, query_pagination, authenticate_app
+from .dependecies import (
+    get_service,
+    query_pagination,
+    authenticate_app,
+    set_next_cursor,
+    negotiate_entry_list_response,
+    query_entry_list_fields,
+    query_fields,
+    ENTRY_LIST_RESPONSES,
+)
+from ..responses import TrustedJSONResponse
 from ..schemas import EntrySchema, CreateEntrySchema, UpdateEntrySchema
-from ..services import EntryService
+from ..services import AsyncEntryService
 
 router = APIRouter(
     dependencies=[Depends(authenticate_app)],
 )
 
 
-@router.get("/{user_id}/entries", response_model=list[EntrySchema], operation_id="get_user_entries")
+@router.get(
+    "/{user_id}/entries",
+    response_model=list[EntrySchema],
+    responses=ENTRY_LIST_RESPONSES,
+    operation_id="get_user_entries",
+)
 async def get_user_entries(
     user_id: UUID,
     warning_level: warning_levels = "information",
     page_info: Pagination = Depends(query_pagination),
-    entry_service: EntryService = Depends(get_service(EntryService)),
-) -> Iterable[EntrySchema]:
-    entries = entry_service.get_all_by_owner(
+    fields: frozenset[str] | None = Depends(query_entry_list_fields),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
+    entries_response: Callable[[Page[dict[str, Any]]], Response] = Depends(negotiate_entry_list_response),
+) -> Response:
+    entries = await entry_service.get_all_by_owner(
         page_info=page_info,
         owner_id=user_id,
         warning_level=warning_level,
+        fields=fields,
     )
-    return entries
+    return entries_response(entries)
 
 
 @router.post(
@@ -37,9 +55,9 @@ async def get_user_entries(
 async def post_new_entry(
     user_id: UUID,
     entry: CreateEntrySchema,
-    entry_service: EntryService = Depends(get_service(EntryService)),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
 ) -> EntrySchema:
-    new_entry = entry_service.create(user_id, entry)
+    new_entry = await entry_service.create(user_id, entry)
     return new_entry
 
 
@@ -52,9 +70,9 @@ async def put_entry(
     user_id: UUID,
     entry_id: UUID,
     update_entry: UpdateEntrySchema,
-    entry_service: EntryService = Depends(get_service(EntryService)),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
 ) -> EntrySchema:
-    updated_entry = entry_service.update(entry_id, user_id, update_entry)
+    updated_entry = await entry_service.update(entry_id, user_id, update_entry)
 
     return updated_entry
 
@@ -64,26 +82,29 @@ async def delete_entry_for_user(
     user_id: UUID,
     entry_id: UUID,
     permanent: bool = False,
-    entry_service: EntryService = Depends(get_service(EntryService)),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
 ) -> None:
-    entry_service.delete(entry_id, user_id, permanent=permanent)
+    await entry_service.delete(entry_id, user_id, permanent=permanent)
 
 
 @router.get("/{user_id}/entries/trash", response_model=list[EntrySchema], operation_id="get_trashed_user_entries")
 async def get_trashed_entries(
     user_id: UUID,
     page_info: Pagination = Depends(query_pagination),
-    entry_service: EntryService = Depends(get_service(EntryService)),
-) -> Iterable:
-    entries = entry_service.deleted_entries(page_info=page_info, user_id=user_id)
-    return entries
+    fields: frozenset[str] | None = Depends(query_fields),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
+) -> TrustedJSONResponse:
+    entries = await entry_service.deleted_entries(page_info=page_info, user_id=user_id, fields=fields)
+    response = TrustedJSONResponse(entries)
+    set_next_cursor(response, entries)
+    return response
 
 
 @router.post("/{user_id}/entries/trash/{entry_id}/undo", response_model=EntrySchema, operation_id="undo_trashed_entry")
 async def post_undo_deleted_entry(
     user_id: UUID,
     entry_id: UUID,
-    entry_service: EntryService = Depends(get_service(EntryService)),
+    entry_service: AsyncEntryService = Depends(get_service(AsyncEntryService)),
 ) -> Iterable:
-    entries = entry_service.undo_deleted_entry(entry_id=entry_id, user_id=user_id)
+    entries = await entry_service.undo_deleted_entry(entry_id=entry_id, user_id=user_id)
     return entries
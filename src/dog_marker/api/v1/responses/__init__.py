@@ -0,0 +1,5 @@
+__all__ = ["TrustedJSONResponse", "NDJSONResponse", "MsgPackResponse"]
+
+from .trusted_json_response import TrustedJSONResponse
+from .ndjson_response import NDJSONResponse
+from .msgpack_response import MsgPackResponse
@@ -0,0 +1,26 @@
+from typing import Any, AsyncIterable, AsyncIterator, Mapping
+
+import orjson
+from fastapi.responses import StreamingResponse
+
+
+class NDJSONResponse(StreamingResponse):
+    """Newline delimited JSON of batches of data read from our own database, written while they are read.
+
+    Every item is one line written like TrustedJSONResponse. Only the current batch is held in memory.
+    """
+
+    media_type = "application/x-ndjson"
+
+    def __init__(
+        self,
+        batches: AsyncIterable[list[Any]],
+        status_code: int = 200,
+        headers: Mapping[str, str] | None = None,
+    ):
+        super().__init__(self.encode(batches), status_code=status_code, headers=headers)
+
+    @staticmethod
+    async def encode(batches: AsyncIterable[list[Any]]) -> AsyncIterator[bytes]:
+        async for batch in batches:
+            yield b"".join(orjson.dumps(item, option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE) for item in batch)
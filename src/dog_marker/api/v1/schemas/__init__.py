@@ -1,4 +1,13 @@
-__all__ = ["CategorySchema", "EntrySchema", "CreateEntrySchema", "UpdateEntrySchema"]
+__all__ = [
+    "CategorySchema",
+    "EntrySchema",
+    "CreateEntrySchema",
+    "UpdateEntrySchema",
+    "EntryClusterSchema",
+    "EntryColumnsSchema",
+]
 
 from .category import CategorySchema
 from .entry import EntrySchema, CreateEntrySchema, UpdateEntrySchema
+from .entry_cluster import EntryClusterSchema
+from .entry_columns import EntryColumnsSchema
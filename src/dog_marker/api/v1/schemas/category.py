@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Any
+
 from pydantic import BaseModel
 
 from dog_marker.database.schemas import Category
@@ -13,3 +15,8 @@ class CategorySchema(BaseModel):
     @staticmethod
     def from_db(value: Category) -> CategorySchema:
         return CategorySchema(key=value.key, title=value.title, description=value.description)
+
+    @staticmethod
+    def dump_row(value: Category) -> dict[str, Any]:
+        """model_dump of the CategorySchema of a category of our own database, built without validating it again."""
+        return {"key": value.key, "title": value.title, "description": value.description}
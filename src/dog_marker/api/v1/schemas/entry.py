@@ -1,12 +1,13 @@
 from __future__ import annotations
 
 from datetime import datetime
+from typing import Any
 from uuid import UUID
 
 from pydantic import BaseModel, Field, ConfigDict, HttpUrl
 
 from dog_marker.database.models import EntryDbModel
-from dog_marker.database.schemas import warning_levels, WarningLevel
+from dog_marker.database.schemas import warning_levels, WarningLevel, EntryRow
 from dog_marker.dtypes.coordinate import Longitude, Latitude
 from .category import CategorySchema
 
@@ -47,6 +48,32 @@ class EntrySchema(BaseModel):
             is_deleted=entry.is_deleted,
         )
 
+    @staticmethod
+    def dump_row(entry: EntryRow, is_owner: bool = False, fields: frozenset[str] | None = None) -> dict[str, Any]:
+        """model_dump of the EntrySchema of a row of our own database, built without validating it again.
+
+        The row was validated when it was written, for TrustedJSONResponse. With fields only those are dumped.
+        """
+        dump = {
+            "id": entry.id,
+            "title": entry.title,
+            "description": entry.description,
+            "image_path": entry.image_path,
+            "image_delete_url": entry.image_delete_url if is_owner else None,
+            "longitude": entry.longitude,
+            "latitude": entry.latitude,
+            "warning_level": WarningLevel(entry.warning_level or 0).to_literal(),
+            "categories": [category.key for category in entry.categories],
+            "category_infos": [CategorySchema.dump_row(category) for category in entry.categories],
+            "create_date": entry.create_date,
+            "update_date": entry.update_date,
+            "is_owner": is_owner,
+            "is_deleted": entry.is_deleted,
+        }
+        if fields is not None:
+            return {field: value for field, value in dump.items() if field in fields}
+        return dump
+
 
 class CreateEntrySchema(BaseModel):
     id: UUID | None = Field(None)
@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+from dog_marker.database.schemas import EntryCluster, WarningLevel, warning_levels
+from dog_marker.dtypes.coordinate import Longitude, Latitude
+
+
+class EntryClusterSchema(BaseModel):
+    geohash: str
+    longitude: Longitude
+    latitude: Latitude
+    count: int
+    warning_level: warning_levels
+
+    @staticmethod
+    def from_db(value: EntryCluster) -> EntryClusterSchema:
+        return EntryClusterSchema(
+            geohash=value.geohash,
+            longitude=value.longitude,
+            latitude=value.latitude,
+            count=value.count,
+            warning_level=WarningLevel(value.warning_level).to_literal(),
+        )
@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Any, Iterable
+from uuid import UUID
+
+from pydantic import BaseModel, Field
+
+from dog_marker.database.schemas import warning_levels
+from dog_marker.dtypes.coordinate import Longitude, Latitude
+from .category import CategorySchema
+
+
+class EntryColumnsSchema(BaseModel):
+    """Entries of a listing as parallel arrays, the markers of a map without the repeated keys of EntrySchema.
+
+    The i-th entry is id[i], longitude[i], ..., its categories are indices into category_infos.
+    """
+
+    id: list[UUID]
+    longitude: list[Longitude]
+    latitude: list[Latitude]
+    warning_level: list[warning_levels]
+    categories: list[list[int]] = Field(description="Indices into category_infos per entry")
+    category_infos: list[CategorySchema]
+
+    @staticmethod
+    def dump_entries(entries: Iterable[dict[str, Any]]) -> dict[str, Any]:
+        """model_dump of the columns of EntrySchema.dump_row dicts, built without validating them again."""
+        columns: dict[str, Any] = {
+            "id": [],
+            "longitude": [],
+            "latitude": [],
+            "warning_level": [],
+            "categories": [],
+            "category_infos": [],
+        }
+        indices: dict[str, int] = {}
+        for entry in entries:
+            columns["id"].append(entry["id"])
+            columns["longitude"].append(entry["longitude"])
+            columns["latitude"].append(entry["latitude"])
+            columns["warning_level"].append(entry["warning_level"])
+            for category in entry["category_infos"]:
+                if category["key"] not in indices:
+                    indices[category["key"]] = len(columns["category_infos"])
+                    columns["category_infos"].append(category)
+            columns["categories"].append([indices[key] for key in entry["categories"]])
+        return columns
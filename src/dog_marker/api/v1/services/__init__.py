@@ -1,4 +1,5 @@
-__all__ = ["EntryService", "CategoryService"]
+__all__ = ["EntryService", "CategoryService", "AsyncService", "AsyncEntryService", "AsyncCategoryService"]
 
-from .entry_service import EntryService
-from .category_service import CategoryService
+from .async_service import AsyncService
+from .entry_service import EntryService, AsyncEntryService
+from .category_service import CategoryService, AsyncCategoryService
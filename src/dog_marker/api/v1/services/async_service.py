@@ -0,0 +1,61 @@
+from typing import AsyncIterator, Awaitable, Callable, Concatenate, Generic, Iterator, ParamSpec, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from dog_marker.database.executor import SessionExecutor
+
+S = TypeVar("S")
+P = ParamSpec("P")
+R = TypeVar("R")
+
+
+class AsyncService(Generic[S]):
+    """Runs the methods of a sync service without blocking the event loop.
+
+    With an AsyncSession the service runs on the greenlet of AsyncSession.run_sync, so the
+    CRUD code stays the same and every database round-trip awaits the async driver.
+    With a sync Session the service runs on the SessionExecutor in the info of the session,
+    a thread pool bounded by the connection pool, or in the thread pool of the endpoints.
+    """
+
+    service: Callable[[Session], S]
+
+    def __init__(self, db: Session | AsyncSession):
+        self.db = db
+
+    async def run(self, call: Callable[[S], R]) -> R:
+        if isinstance(self.db, AsyncSession):
+            return await self.db.run_sync(lambda session: call(self.service(session)))
+        service = self.service(self.db)
+        executor: SessionExecutor | None = self.db.info.get("executor")
+        if executor is None:
+            return await run_in_threadpool(call, service)
+        return await executor.run(lambda: call(service))
+
+    async def iterate(self, call: Callable[[S], Iterator[R]]) -> AsyncIterator[R]:
+        """Items of a lazy iterator of the service, every step of it runs like run. None ends it."""
+        iterator = await self.run(call)
+        while (item := await self.run(lambda _: next(iterator, None))) is not None:
+            yield item
+
+
+def run_async(method: Callable[Concatenate[S, P], R]) -> Callable[Concatenate[AsyncService[S], P], Awaitable[R]]:
+    """Awaitable variant of the service method for an AsyncService of the same service."""
+
+    async def __internal(self: AsyncService[S], *args: P.args, **kwargs: P.kwargs) -> R:
+        return await self.run(lambda service: method(service, *args, **kwargs))
+
+    return __internal
+
+
+def iterate_async(
+    method: Callable[Concatenate[S, P], Iterator[R]]
+) -> Callable[Concatenate[AsyncService[S], P], AsyncIterator[R]]:
+    """Async iterator variant of a service method returning a lazy iterator, see AsyncService.iterate."""
+
+    def __internal(self: AsyncService[S], *args: P.args, **kwargs: P.kwargs) -> AsyncIterator[R]:
+        return self.iterate(lambda service: method(service, *args, **kwargs))
+
+    return __internal
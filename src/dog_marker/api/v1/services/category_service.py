@@ -1,7 +1,7 @@
 from sqlalchemy.orm import Session
-from typing import Iterable
 
 from dog_marker.database.cruds import CategoryCRUD
+from .async_service import AsyncService, run_async
 from ..schemas import CategorySchema
 
 
@@ -9,8 +9,12 @@ class CategoryService:
     def __init__(self, db: Session):
         self.crud = CategoryCRUD(db)
 
-    def all(self) -> Iterable[CategorySchema]:
+    def all(self) -> list[CategorySchema]:
         categories = self.crud.all()
+        return [CategorySchema.from_db(category) for category in categories]
 
-        for category in categories:
-            yield CategorySchema.from_db(category)
+
+class AsyncCategoryService(AsyncService[CategoryService]):
+    service = CategoryService
+
+    all = run_async(CategoryService.all)
@@ -1,5 +1,5 @@
 import datetime
-from typing import Callable, Iterable
+from typing import Any, Callable, Iterable, Iterator
 from uuid import UUID
 
 from pydantic import HttpUrl
@@ -8,12 +8,17 @@ from sqlalchemy.orm import Session
 
 from dog_marker.database.cruds import EntryCRUD
 from dog_marker.database.models import EntryDbModel
-from dog_marker.database.schemas import warning_levels
-from dog_marker.dtypes.coordinate import Coordinate
-from dog_marker.dtypes.pagination import Pagination
+from dog_marker.database.schemas import warning_levels, EntryRow
+from dog_marker.dtypes import geohash
+from dog_marker.dtypes.coordinate import Coordinate, BoundingBox
+from dog_marker.dtypes.pagination import Pagination, Page
+from .async_service import AsyncService, run_async, iterate_async
 from .. import NotAuthorizedError
 from ..errors import EntityNotFound
-from ..schemas import EntrySchema, CreateEntrySchema, UpdateEntrySchema
+from ..schemas import EntrySchema, CreateEntrySchema, UpdateEntrySchema, EntryClusterSchema
+
+# Rows per read of an export, the memory of an export stays at one batch
+EXPORT_BATCH_SIZE = 1000
 
 
 # noinspection PyMethodMayBeStatic
@@ -74,9 +79,51 @@ class EntryService:
 
         return __internal
 
-    def get(self, entry_id: UUID, user_id: UUID | None = None):
+    def loads_categories(self, fields: frozenset[str] | None = None) -> bool:
+        """Whether the EntrySchema fields show the categories of the entries."""
+        return fields is None or "categories" in fields or "category_infos" in fields
+
+    def row_map_schema(
+        self, test_user_id: UUID | None = None, fields: frozenset[str] | None = None
+    ) -> Callable[[EntryRow], dict[str, Any]]:
+        def __internal(entry: EntryRow) -> dict[str, Any]:
+            is_owner = entry.user_id == test_user_id if test_user_id else False
+            return EntrySchema.dump_row(entry, is_owner=is_owner, fields=fields)
+
+        return __internal
+
+    def page_map_schema(
+        self, test_user_id: UUID | None = None, fields: frozenset[str] | None = None
+    ) -> Callable[[Page[EntryRow]], Page[dict[str, Any]]]:
+        def __internal(entries: Page[EntryRow]) -> Page[dict[str, Any]]:
+            schemas = map(self.row_map_schema(test_user_id, fields), entries)
+            return Page(schemas, next_cursor=entries.next_cursor)
+
+        return __internal
+
+    def stream_map_schema(
+        self, test_user_id: UUID | None = None, fields: frozenset[str] | None = None
+    ) -> Callable[[Iterator[list[EntryRow]]], Iterator[list[dict[str, Any]]]]:
+        def __internal(batches: Iterator[list[EntryRow]]) -> Iterator[list[dict[str, Any]]]:
+            map_schema = self.row_map_schema(test_user_id, fields)
+            for entries in batches:
+                yield [map_schema(entry) for entry in entries]
+
+        return __internal
+
+    def get(self, entry_id: UUID, user_id: UUID | None = None, fields: frozenset[str] | None = None):
+        """The EntrySchema of the entry, with fields the dump_row of only those, read without the others."""
         entry_crud = EntryCRUD(self.db)
-        flow = entry_crud.get(entry_id).and_then(self.check_is_marked_to_delete()).map(self.map_schema(user_id))
+        if fields is None:
+            flow = entry_crud.get(entry_id).and_then(self.check_is_marked_to_delete()).map(self.map_schema(user_id))
+        else:
+            flow = (
+                entry_crud.query()
+                .map(entry_crud.filter_marked_to_delete())
+                .map(entry_crud.project(fields))
+                .and_then(entry_crud.get_row(entry_id, self.loads_categories(fields)))
+                .map(self.row_map_schema(user_id, fields))
+            )
 
         if flow.is_err():
             raise flow.err_value
@@ -89,7 +136,7 @@ class EntryService:
         self.check_domain(data.image_path, data.image_delete_url)
 
         image_path = str(data.image_path) if data.image_path else None
-        image_delete_url = data.image_delete_url if data.image_delete_url else None
+        image_delete_url = str(data.image_delete_url) if data.image_delete_url else None
 
         flow = (
             entry_crud.create(user_id, data.title)
@@ -99,9 +146,10 @@ class EntryService:
             .map(entry_crud.set_description(data.description))
             .map(entry_crud.set_warning_level(data.warning_level))
             .map(entry_crud.set_coordinate(data.longitude, data.latitude))
-            .and_then(entry_crud.set_categories(data.categories))
             .map(entry_crud.set_create_date(data.create_date))
+            .and_then(entry_crud.set_categories(data.categories))
             .map(entry_crud.commit())
+            .map(entry_crud.sync_spatial_index())
             .map(self.map_schema(user_id))
         )
 
@@ -117,6 +165,9 @@ class EntryService:
         coordinate: Coordinate | None = None,
         date_from: datetime.datetime | None = None,
         warning_level: warning_levels | None = None,
+        max_distance_km: float | None = None,
+        categories: list[str] | None = None,
+        fields: frozenset[str] | None = None,
     ):
 
         entry_crud = EntryCRUD(self.db)
@@ -127,9 +178,46 @@ class EntryService:
             .map(entry_crud.filter_user_deleted(user_id=user_id))
             .map(entry_crud.filter_by_date_from(date_from))
             .map(entry_crud.filter_by_warning_level(warning_level))
-            .map(entry_crud.order_by_coordinate(coordinate))
-            .map(entry_crud.all(page_info))
-            .map(self.foreach_map_schema(user_id))
+            .map(entry_crud.filter_by_categories(categories))
+            .map(entry_crud.filter_by_distance(coordinate, max_distance_km))
+            .map(entry_crud.project(fields))
+            .and_then(entry_crud.all_nearest(page_info, coordinate, warning_level, max_distance_km))
+            .map(entry_crud.with_categories(self.loads_categories(fields)))
+            .map(self.page_map_schema(user_id, fields))
+        )
+
+        if flow.is_err():
+            raise flow.err_value
+
+        return flow.value
+
+    def export(
+        self,
+        user_id: UUID | None = None,
+        coordinate: Coordinate | None = None,
+        date_from: datetime.datetime | None = None,
+        warning_level: warning_levels | None = None,
+        max_distance_km: float | None = None,
+        categories: list[str] | None = None,
+        fields: frozenset[str] | None = None,
+    ):
+        """Iterator over batches of all entries get_all shows, read lazily while iterating."""
+
+        # Without filters of the client only deleted and hidden entries are left out of the id ranges
+        dense = date_from is None and warning_level is None and not categories and max_distance_km is None
+        entry_crud = EntryCRUD(self.db)
+        flow = (
+            entry_crud.query()
+            .map(entry_crud.filter_marked_to_delete())
+            .map(entry_crud.filter_owner_deleted())
+            .map(entry_crud.filter_user_deleted(user_id=user_id))
+            .map(entry_crud.filter_by_date_from(date_from))
+            .map(entry_crud.filter_by_warning_level(warning_level))
+            .map(entry_crud.filter_by_categories(categories))
+            .map(entry_crud.filter_by_distance(coordinate, max_distance_km))
+            .map(entry_crud.project(fields))
+            .map(entry_crud.stream(EXPORT_BATCH_SIZE, self.loads_categories(fields), dense))
+            .map(self.stream_map_schema(user_id, fields))
         )
 
         if flow.is_err():
@@ -144,6 +232,8 @@ class EntryService:
         coordinate: Coordinate | None = None,
         date_from: datetime.datetime | None = None,
         warning_level: warning_levels | None = None,
+        max_distance_km: float | None = None,
+        fields: frozenset[str] | None = None,
     ):
 
         entry_crud = EntryCRUD(self.db)
@@ -154,9 +244,11 @@ class EntryService:
             .map(entry_crud.filter_owner_deleted())
             .map(entry_crud.filter_by_date_from(date_from))
             .map(entry_crud.filter_by_warning_level(warning_level))
-            .map(entry_crud.order_by_coordinate(coordinate))
-            .map(entry_crud.all(page_info))
-            .map(self.foreach_map_schema(owner_id))
+            .map(entry_crud.filter_by_distance(coordinate, max_distance_km))
+            .map(entry_crud.project(fields))
+            .and_then(entry_crud.paginate(page_info, coordinate))
+            .map(entry_crud.with_categories(self.loads_categories(fields)))
+            .map(self.page_map_schema(owner_id, fields))
         )
 
         if flow.is_err():
@@ -164,13 +256,39 @@ class EntryService:
 
         return flow.value
 
+    def get_clusters(
+        self,
+        bounding_box: BoundingBox,
+        zoom: int,
+        user_id: UUID | None = None,
+        date_from: datetime.datetime | None = None,
+        warning_level: warning_levels | None = None,
+    ) -> Iterable[EntryClusterSchema]:
+
+        entry_crud = EntryCRUD(self.db)
+        flow = (
+            entry_crud.query()
+            .map(entry_crud.filter_marked_to_delete())
+            .map(entry_crud.filter_owner_deleted())
+            .map(entry_crud.filter_user_deleted(user_id=user_id))
+            .map(entry_crud.filter_by_date_from(date_from))
+            .map(entry_crud.filter_by_warning_level(warning_level))
+            .map(entry_crud.filter_by_bounding_box(bounding_box))
+            .map(entry_crud.clusters(geohash.precision_for_zoom(zoom)))
+        )
+
+        if flow.is_err():
+            raise flow.err_value
+
+        return [EntryClusterSchema.from_db(cluster) for cluster in flow.value]
+
     def update(self, entry_id: UUID, user_id: UUID, data: UpdateEntrySchema) -> EntrySchema:
         entry_crud = EntryCRUD(self.db)
 
         self.check_domain(data.image_path, data.image_delete_url)
 
         image_path = str(data.image_path) if data.image_path else None
-        image_delete_url = data.image_delete_url if data.image_delete_url else None
+        image_delete_url = str(data.image_delete_url) if data.image_delete_url else None
 
         flow = (
             entry_crud.get(entry_id)
@@ -183,6 +301,7 @@ class EntryService:
             .map(entry_crud.set_coordinate(data.longitude, data.latitude))
             .and_then(entry_crud.set_categories(data.categories))
             .map(entry_crud.commit())
+            .map(entry_crud.sync_spatial_index())
             .map(self.map_schema(user_id))
         )
 
@@ -191,15 +310,19 @@ class EntryService:
 
         return flow.value
 
-    def deleted_entries(self, page_info: Pagination, user_id: UUID) -> Iterable[EntrySchema]:
+    def deleted_entries(
+        self, page_info: Pagination, user_id: UUID, fields: frozenset[str] | None = None
+    ) -> Page[dict[str, Any]]:
         entry_crud = EntryCRUD(self.db)
         flow = (
             entry_crud.query()
             .map(entry_crud.filter_marked_to_delete())
             .map(entry_crud.filter_owner_deleted([user_id]))
             .map(entry_crud.filter_show_trash(user_id=user_id))
-            .map(entry_crud.all(page_info))
-            .map(self.foreach_map_schema(user_id))
+            .map(entry_crud.project(fields))
+            .and_then(entry_crud.paginate(page_info))
+            .map(entry_crud.with_categories(self.loads_categories(fields)))
+            .map(self.page_map_schema(user_id, fields))
         )
 
         if flow.is_err():
@@ -214,6 +337,7 @@ class EntryService:
             .and_then(self.check_is_marked_to_delete())
             .map(entry_crud.delete(user_id=user_id, permanent=permanent))
             .map(entry_crud.commit())
+            .map(entry_crud.sync_spatial_index())
         )
 
         if flow.is_err():
@@ -226,6 +350,7 @@ class EntryService:
             .and_then(self.check_is_marked_to_delete())
             .map(entry_crud.undo_delete(user_id))
             .map(entry_crud.commit())
+            .map(entry_crud.sync_spatial_index())
             .map(self.map_schema(user_id))
         )
 
@@ -233,3 +358,18 @@ class EntryService:
             raise flow.err_value
 
         return flow.value
+
+
+class AsyncEntryService(AsyncService[EntryService]):
+    service = EntryService
+
+    get = run_async(EntryService.get)
+    create = run_async(EntryService.create)
+    get_all = run_async(EntryService.get_all)
+    export = iterate_async(EntryService.export)
+    get_all_by_owner = run_async(EntryService.get_all_by_owner)
+    get_clusters = run_async(EntryService.get_clusters)
+    update = run_async(EntryService.update)
+    deleted_entries = run_async(EntryService.deleted_entries)
+    delete = run_async(EntryService.delete)
+    undo_deleted_entry = run_async(EntryService.undo_deleted_entry)
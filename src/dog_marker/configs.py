@@ -18,12 +18,22 @@ def get_int_or_none(value: str | int | None) -> int | None:
 class Config:
     DATABASE_URL: str = os.environ.get("DATABASE_URL", "sqlite:///./sql_app.db")
     CREATE_DB: bool = os.environ.get("CREATE_DB") == "1"
+    # Endpoints use an async engine (psycopg async or aiosqlite), the background jobs keep the sync one
+    ASYNC_DB: bool = os.environ.get("ASYNC_DB") == "1"
 
     POSTGRES_DB_POOL_SIZE: int = get_int(os.environ.get("POSTGRES_DB_POOL_SIZE", 20))
     POSTGRES_DB_MAX_OVERFLOW: int = get_int(os.environ.get("POSTGRES_DB_MAX_OVERFLOW", 20))
 
+    # In-memory index per worker, reloaded every JOB_CLEANUP_INTERVAL_SECONDS. Until then the entries written by other
+    # workers are missing from it, so the nearest entries are read from SQL. Pays off most with a single worker.
+    SPATIAL_INDEX: bool = os.environ.get("SPATIAL_INDEX") == "1"
+    POSTGIS: bool = os.environ.get("POSTGIS") == "1"
+
     APP_TOKEN: str | None = os.environ.get("APP_TOKEN", None)
 
+    # Smaller responses are sent uncompressed
+    COMPRESSION_MINIMUM_SIZE: int = get_int(os.environ.get("COMPRESSION_MINIMUM_SIZE", 500))
+
     DELETE_TRASH_ENTRIES_AFTER_MINUTES: int | None = get_int_or_none(
         os.environ.get("DELETE_TRASH_ENTRIES_AFTER_MINUTES", None)
     )
@@ -1,9 +1,15 @@
-__all__ = ["Base", "create_db"]
+__all__ = ["Base", "create_db", "create_async_db", "async_database_url"]
 
-from sqlalchemy import MetaData, create_engine
+from typing import Any
+
+from sqlalchemy import MetaData, create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 
 from dog_marker import Config
+from .functions import register_sqlite_functions, detect_postgis
+from .instrumentation import instrument_engine
+from .executor import SessionExecutor
 
 convention = {
     "ix": "ix_%(column_0_label)s",
@@ -17,6 +23,14 @@ metadata = MetaData(naming_convention=convention)
 
 Base = declarative_base(metadata=metadata)
 
+# psycopg 3 has an async mode of its own, the sync and the async engine share the driver
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+psycopg",
+    "postgresql+psycopg2": "postgresql+psycopg",
+}
+
 
 def create_db(config: Config) -> sessionmaker[Session]:
     is_postgres = config.DATABASE_URL.startswith("postgresql")
@@ -28,6 +42,10 @@ def create_db(config: Config) -> sessionmaker[Session]:
     else:
         engine = create_engine(config.DATABASE_URL, connect_args={"check_same_thread": False})
 
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", register_sqlite_functions)
+    instrument_engine(engine)
+
     session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
     if config.CREATE_DB:
@@ -38,8 +56,50 @@ def create_db(config: Config) -> sessionmaker[Session]:
             alembic_cfg = Config()
             alembic_cfg.set_main_option("script_location", "alembic_postgres")
             alembic_cfg.set_main_option("sqlalchemy.url", config.DATABASE_URL)
-            command.upgrade(alembic_cfg, "head")
+            # The postgis branch is opt-in, the default branch runs without the extension
+            command.upgrade(alembic_cfg, "heads" if config.POSTGIS else "default@head")
 
         else:
             Base.metadata.create_all(bind=engine)
+
+    # One thread per connection the pool can hand out, see SessionExecutor
+    info: dict[str, Any] = {"executor": SessionExecutor(config.POSTGRES_DB_POOL_SIZE + config.POSTGRES_DB_MAX_OVERFLOW)}
+    if is_postgres:
+        info["postgis"] = detect_postgis(engine)
+
+    if config.SPATIAL_INDEX:
+        from .spatial_index import SpatialIndex
+
+        spatial_index = SpatialIndex()
+        with session_local() as session:
+            spatial_index.load(session)
+        info["spatial_index"] = spatial_index
+
+    session_local.configure(info=info)
     return session_local
+
+
+def async_database_url(database_url: str) -> str:
+    url = make_url(database_url)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.drivername, url.drivername)).render_as_string(hide_password=False)
+
+
+def create_async_db(config: Config, session_local: sessionmaker[Session]) -> async_sessionmaker[AsyncSession]:
+    """Async sessions on the database of create_db, sharing the info of its sessions.
+
+    Runs after create_db, which already created or migrated the database.
+    """
+    database_url = async_database_url(config.DATABASE_URL)
+
+    if database_url.startswith("postgresql"):
+        engine = create_async_engine(
+            database_url, pool_size=config.POSTGRES_DB_POOL_SIZE, max_overflow=config.POSTGRES_DB_MAX_OVERFLOW
+        )
+    else:
+        engine = create_async_engine(database_url)
+
+    if engine.dialect.name == "sqlite":
+        event.listen(engine.sync_engine, "connect", register_sqlite_functions)
+    instrument_engine(engine.sync_engine)
+
+    return async_sessionmaker(engine, autoflush=False, info=session_local.kw.get("info", {}))
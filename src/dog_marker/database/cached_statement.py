@@ -0,0 +1,59 @@
+__all__ = ["CachedStatement"]
+
+from typing import Any, Callable, Hashable
+
+from sqlalchemy import Result, Select
+from sqlalchemy.orm import Session
+from sqlalchemy.util import LRUCache
+
+STATEMENT_CACHE_SIZE = 500
+
+
+class CachedStatement:
+    """Select that is built once per sequence of steps, requests only bind their parameters.
+
+    Every step names the change it makes, the statement after a sequence of steps is cached
+    under their names. So the expression tree and its SQLAlchemy cache key are built once per
+    process and the statement of a later request only differs in the parameters it binds.
+    The name of a step has to cover everything its build function depends on besides the
+    bindparams, e.g. the number of OR-ed conditions or whether the database has PostGIS.
+    Steps named after client input, e.g. the requested fields, can have many combinations, so
+    the cache only keeps the least recently used statements.
+    """
+
+    _cache: LRUCache[tuple[Hashable, ...], Select] = LRUCache(STATEMENT_CACHE_SIZE)
+
+    def __init__(self, key: tuple[Hashable, ...], statement: Select, params: dict[str, Any]):
+        self.key = key
+        self.statement = statement
+        self.params = params
+
+    @classmethod
+    def root(cls, step: Hashable, build: Callable[[], Select], **params: Any) -> "CachedStatement":
+        key = (step,)
+        statement = cls._cache.get(key)
+        if statement is None:
+            statement = cls._cache.setdefault(key, build())
+        return cls(key, statement, params)
+
+    @classmethod
+    def clear(cls) -> None:
+        cls._cache.clear()
+
+    def then(self, step: Hashable, build: Callable[[Select], Select], **params: Any) -> "CachedStatement":
+        key = (*self.key, step)
+        statement = self._cache.get(key)
+        if statement is None:
+            statement = self._cache.setdefault(key, build(self.statement))
+        return CachedStatement(key, statement, {**self.params, **params})
+
+    def execute(self, session: Session, **execution_options: Any) -> Result:
+        return session.execute(self.statement, self.params, execution_options=execution_options)
+
+    def all(self, session: Session) -> list:
+        """The instances of an entity select, the rows of a column select."""
+        result = self.execute(session)
+        description = self.statement.column_descriptions[0]
+        if len(self.statement.column_descriptions) == 1 and description["expr"] is description["entity"]:
+            return list(result.scalars().all())
+        return list(result.all())
@@ -1,17 +1,36 @@
 import datetime
-from typing import Callable, Type
+from collections import defaultdict
+from typing import Any, Callable, Hashable, Iterator, Sequence
 from uuid import UUID
 
 from result import Result, Err, Ok
-from sqlalchemy import desc, exists, or_, and_
-from sqlalchemy.orm import Session, Query
-from sqlalchemy.sql.operators import is_
+from sqlalchemy import Double, Row, exists, or_, and_, func, select, insert, delete, bindparam, null
+from sqlalchemy.orm import Session, selectinload
 
-from ..errors import DbNotFoundError
+from ..cached_statement import CachedStatement
+from ..errors import DbNotFoundError, DbInvalidCursorError
+from ..functions import has_postgis, geography_point, ENTRIES_LOCATION
 from ..models import EntryDbModel, CategoryDbModel, EntryImageDbModel, HiddenEntry
-from ..schemas import WarningLevel, warning_levels
-from ...dtypes.coordinate import Coordinate, Longitude, Latitude
-from ...dtypes.pagination import Pagination
+from ..schemas import WarningLevel, warning_levels, EntryCluster, EntryRow, Category
+from ..spatial_index import get_spatial_index
+from ...dtypes import geohash
+from ...dtypes.coordinate import Coordinate, Longitude, Latitude, BoundingBox
+from ...dtypes.pagination import Pagination, Page, encode_cursor, decode_cursor
+
+MAX_NEAREST_CANDIDATES = 10_000
+
+ENTRY_ROW_COLUMNS = tuple(getattr(EntryDbModel, field) for field in EntryRow._fields if field != "categories")
+# Columns project selects as NULL when they are not requested, the others are cheap and always selected
+ENTRY_ROW_SKIPPABLE_COLUMNS = ("description", "image_path", "image_delete_url")
+CATEGORY_ASSOCIATIONS = EntryDbModel.categories.property.secondary
+CATEGORIES = select(
+    CATEGORY_ASSOCIATIONS.c.item_id, CategoryDbModel.key, CategoryDbModel.title, CategoryDbModel.description
+).join(CategoryDbModel, CategoryDbModel.key == CATEGORY_ASSOCIATIONS.c.category_key)
+CATEGORIES_OF_ENTRIES = CATEGORIES.where(CATEGORY_ASSOCIATIONS.c.item_id.in_(bindparam("entry_ids", expanding=True)))
+# For rows ordered by id, one range of the primary key instead of an IN list of every id
+CATEGORIES_OF_ENTRY_RANGE = CATEGORIES.where(
+    CATEGORY_ASSOCIATIONS.c.item_id.between(bindparam("first_id"), bindparam("last_id"))
+)
 
 
 # noinspection PyMethodMayBeStatic
@@ -25,15 +44,364 @@ class EntryCRUD:
             return Err(DbNotFoundError(f"Cannot find entry with id {entry_id}"))
         return Ok(result)
 
-    def query(self) -> Result[Query[Type[EntryDbModel]], Exception]:
-        return Ok(self.db.query(EntryDbModel))
+    def query(self) -> Result[CachedStatement, Exception]:
+        """Select of the entries, the query closures only bind their parameters to statements built once."""
+        return Ok(CachedStatement.root("entries", lambda: select(EntryDbModel)))
+
+    def eager_load(self):
+        """Loads the categories EntrySchema needs with one IN query for the whole result."""
+
+        def __internal(query: CachedStatement) -> CachedStatement:
+            return query.then("eager_load", lambda statement: statement.options(selectinload(EntryDbModel.categories)))
+
+        return __internal
+
+    def project(self, fields: frozenset[str] | None = None):
+        """Selects only the columns of EntryRow, the rows skip the identity map and change tracking.
+
+        With fields, the skippable columns of EntryRow that are not requested are selected as NULL,
+        so e.g. the image_path and image_delete_url subqueries on the entry images are not run.
+        Only those few columns are skipped, so the fields of a request map to one of a fixed set of statements.
+        """
+        skipped: tuple[str, ...] = ()
+        if fields is not None:
+            skipped = tuple(column for column in ENTRY_ROW_SKIPPABLE_COLUMNS if column not in fields)
+
+        def build(statement):
+            columns = (null().label(column.key) if column.key in skipped else column for column in ENTRY_ROW_COLUMNS)
+            return statement.with_only_columns(*columns)
+
+        def __internal(query: CachedStatement) -> CachedStatement:
+            if not skipped:
+                return query.then("project", lambda statement: statement.with_only_columns(*ENTRY_ROW_COLUMNS))
+            return query.then(("project", skipped), build)
+
+        return __internal
+
+    def with_categories(self, load_categories: bool = True):
+        """Turns the rows of a project query into EntryRows with the categories of all of them in one IN query.
+
+        Without load_categories the EntryRows have no categories and the query is skipped.
+        """
+
+        def __internal(rows: Page) -> Page[EntryRow]:
+            return Page(self._entry_rows(rows, load_categories=load_categories), rows.next_cursor)
+
+        return __internal
+
+    def get_row(self, entry_id: UUID, load_categories: bool = True):
+        """The EntryRow of the entry of a project query, like get reads the entity."""
+
+        def __internal(query: CachedStatement) -> Result[EntryRow, Exception]:
+            rows = query.then(
+                "by_id",
+                lambda statement: statement.where(EntryDbModel.id == bindparam("entry_id")),
+                entry_id=entry_id,
+            ).all(self.db)
+            if not rows:
+                return Err(DbNotFoundError(f"Cannot find entry with id {entry_id}"))
+            return Ok(self._entry_rows(rows, load_categories=load_categories)[0])
+
+        return __internal
+
+    def _entry_rows(
+        self, rows: Sequence[Row], ordered_by_id: bool = False, load_categories: bool = True
+    ) -> list[EntryRow]:
+        if not load_categories:
+            return [EntryRow._make((*row, ())) for row in rows]
+
+        categories: dict[UUID, list[Category]] = defaultdict(list)
+        if rows:
+            # The few categories are shared by many entries, each is built once per page
+            by_key: dict[str, Category] = {}
+            if ordered_by_id:
+                # The range may contain filtered out entries, their categories are not used
+                params = {"first_id": rows[0].id, "last_id": rows[-1].id}
+                category_rows = self.db.execute(CATEGORIES_OF_ENTRY_RANGE, params)
+            else:
+                category_rows = self.db.execute(CATEGORIES_OF_ENTRIES, {"entry_ids": [row.id for row in rows]})
+            for item_id, key, title, description in category_rows:
+                category = by_key.get(key)
+                if category is None:
+                    category = by_key[key] = Category(key=key, title=title, description=description)
+                categories[item_id].append(category)
+
+        return [EntryRow._make((*row, tuple(categories[row.id]))) for row in rows]
+
+    def stream(self, batch_size: int, load_categories: bool = True, dense: bool = False):
+        """Batches of EntryRows of a project query ordered by id, for exports of any size.
+
+        The rows are read with yield_per, from a server-side cursor with PostgreSQL, so only one
+        batch is in memory at a time. Every batch loads its categories like with_categories.
+        Only if the query is dense, i.e. filters out few entries, the categories are read by the id
+        range of the batch. The ids are random, so the range of a selective query spans most entries.
+        """
+
+        def __internal(query: CachedStatement) -> Iterator[list[EntryRow]]:
+            query = query.then("order_by_id", lambda statement: statement.order_by(EntryDbModel.id))
+            for rows in query.execute(self.db, yield_per=batch_size).partitions():
+                yield self._entry_rows(rows, ordered_by_id=dense, load_categories=load_categories)
+
+        return __internal
+
+    def distance_to(self, postgis: bool):
+        """Sort key of the distance to the longitude and latitude bindparams.
+
+        The GiST-indexed KNN distance in meters with PostGIS, else calc_distance in km.
+        """
+        longitude, latitude = bindparam("longitude", type_=Double), bindparam("latitude", type_=Double)
+        if postgis:
+            return ENTRIES_LOCATION.op("<->", return_type=Double)(geography_point(longitude, latitude))
+        return EntryDbModel.calc_distance(longitude, latitude)  # type: ignore
 
     def all(self, page_info: Pagination | None = None):
-        def __internal(query: Query[Type[EntryDbModel]]) -> list[EntryDbModel]:
+        def __internal(query: CachedStatement) -> list[EntryDbModel]:
             if page_info:
-                query = query.offset(page_info.skip).limit(page_info.limit)
-            # noinspection PyTypeChecker
-            return query.all()  # type: ignore
+                query = query.then(
+                    "offset_limit",
+                    lambda statement: statement.offset(bindparam("skip")).limit(bindparam("limit")),
+                    skip=page_info.skip,
+                    limit=page_info.limit,
+                )
+            return query.all(self.db)
+
+        return __internal
+
+    def clusters(self, precision: int):
+        def __internal(query: CachedStatement) -> list[EntryCluster]:
+            def build(statement):
+                # The precision stays a literal, so the select and the group by have the same expression
+                cell = func.substr(EntryDbModel.geohash, 1, precision)
+                return statement.with_only_columns(
+                    cell,
+                    func.avg(EntryDbModel.longitude),
+                    func.avg(EntryDbModel.latitude),
+                    func.count(EntryDbModel.id),
+                    func.max(EntryDbModel.warning_level),
+                ).group_by(cell)
+
+            rows = query.then(("clusters", precision), build).all(self.db)
+
+            return [
+                EntryCluster(
+                    geohash=geohash_cell,
+                    longitude=longitude,
+                    latitude=latitude,
+                    count=count,
+                    warning_level=warning_level,
+                )
+                for geohash_cell, longitude, latitude, count, warning_level in rows
+            ]
+
+        return __internal
+
+    def paginate(self, page_info: Pagination, coordinate: Coordinate | None = None):
+        """Keyset pagination, by (distance, id) to the coordinate or else by (update_date, id) with the newest first.
+
+        The cursor of the page_info continues after the last entry of the previous page,
+        so the cost of a page does not grow with the number of pages before it.
+        Works on entity queries as well as on project queries.
+        """
+
+        def __internal(query: CachedStatement) -> Result[Page[EntryDbModel], Exception]:
+            if coordinate is not None:
+                return self._paginate_by_distance(query, page_info, coordinate)
+            return self._paginate_by_update_date(query, page_info)
+
+        return __internal
+
+    def _read_cursor(self, page_info: Pagination, order: str) -> list | None:
+        if page_info.cursor is None:
+            return None
+        try:
+            values = decode_cursor(page_info.cursor)
+        except ValueError:
+            values = []
+        # The last value is the hex of an entry id, UUID() of anything else would not raise a ValueError
+        if len(values) != 3 or values[0] != order or not isinstance(values[2], str):
+            raise ValueError(f"Cursor {page_info.cursor} is not valid for this listing")
+        return values[1:]
+
+    def _page(
+        self,
+        query: CachedStatement,
+        step: Hashable,
+        order_by: Callable[[], tuple],
+        page_info: Pagination,
+        **params: Any,
+    ) -> CachedStatement:
+        """Orders the query and limits it to one more than the page, to know whether there is a next one.
+
+        Only the first page skips page_info.skip rows, a page with a cursor already continues after
+        the last entry of the previous one, so it has no OFFSET.
+        """
+        if page_info.cursor is not None:
+            return query.then(
+                (step, "after_cursor"),
+                lambda statement: statement.order_by(*order_by()).limit(bindparam("limit")),
+                limit=page_info.limit + 1,
+                **params,
+            )
+        return query.then(
+            step,
+            lambda statement: statement.order_by(*order_by()).offset(bindparam("skip")).limit(bindparam("limit")),
+            skip=page_info.skip,
+            limit=page_info.limit + 1,
+            **params,
+        )
+
+    def _paginate_by_update_date(
+        self, query: CachedStatement, page_info: Pagination
+    ) -> Result[Page[EntryDbModel], Exception]:
+        try:
+            key = self._read_cursor(page_info, "update_date")
+            if key is not None:
+                query = query.then(
+                    "after_update_date",
+                    lambda statement: statement.where(
+                        or_(
+                            EntryDbModel.update_date < bindparam("last_update_date"),
+                            and_(
+                                EntryDbModel.update_date == bindparam("last_update_date"),
+                                EntryDbModel.id < bindparam("last_id"),
+                            ),
+                        )
+                    ),
+                    last_update_date=datetime.datetime.fromisoformat(key[0]),
+                    last_id=UUID(key[1]),
+                )
+        except (TypeError, ValueError) as e:
+            return Err(DbInvalidCursorError(str(e)))
+
+        query = self._page(
+            query,
+            "page_by_update_date",
+            lambda: (EntryDbModel.update_date.desc(), EntryDbModel.id.desc()),
+            page_info,
+        )
+        entries = query.all(self.db)
+
+        if len(entries) <= page_info.limit:
+            return Ok(Page(entries))
+
+        last = entries[page_info.limit - 1]
+        next_cursor = encode_cursor("update_date", last.update_date.isoformat(), last.id.hex)
+        return Ok(Page(entries[: page_info.limit], next_cursor))
+
+    def _paginate_by_distance(
+        self, query: CachedStatement, page_info: Pagination, coordinate: Coordinate
+    ) -> Result[Page[EntryDbModel], Exception]:
+        postgis = has_postgis(self.db)
+        coordinate_params = {"longitude": coordinate.longitude, "latitude": coordinate.latitude}
+        try:
+            key = self._read_cursor(page_info, "distance")
+            if key is not None:
+
+                def after_distance(statement):
+                    distance = self.distance_to(postgis)
+                    return statement.where(
+                        or_(
+                            distance > bindparam("last_distance"),
+                            and_(distance == bindparam("last_distance"), EntryDbModel.id > bindparam("last_id")),
+                        )
+                    )
+
+                query = query.then(
+                    ("after_distance", postgis),
+                    after_distance,
+                    last_distance=float(key[0]),
+                    last_id=UUID(key[1]),
+                    **coordinate_params,
+                )
+        except (TypeError, ValueError) as e:
+            return Err(DbInvalidCursorError(str(e)))
+
+        query = self._page(
+            query,
+            ("page_by_distance", postgis),
+            lambda: (self.distance_to(postgis), EntryDbModel.id),
+            page_info,
+            **coordinate_params,
+        )
+        entries = query.all(self.db)
+
+        if len(entries) <= page_info.limit:
+            return Ok(Page(entries))
+
+        last = entries[page_info.limit - 1]
+        return Ok(Page(entries[: page_info.limit], self._distance_cursor(coordinate, last.id)))
+
+    def _distance_cursor(self, coordinate: Coordinate, entry_id: UUID) -> str:
+        # Read by primary key, so the same query serves entities, projected rows and the spatial index
+        postgis = has_postgis(self.db)
+        query = CachedStatement.root(
+            ("distance_cursor", postgis),
+            lambda: select(self.distance_to(postgis)).where(EntryDbModel.id == bindparam("entry_id")),
+            entry_id=entry_id,
+            longitude=coordinate.longitude,
+            latitude=coordinate.latitude,
+        )
+        last_distance = query.execute(self.db).scalar()
+        return encode_cursor("distance", last_distance, entry_id.hex)
+
+    def all_nearest(
+        self,
+        page_info: Pagination,
+        coordinate: Coordinate | None = None,
+        warning_level: WarningLevel | warning_levels | None = None,
+        max_distance_km: float | None = None,
+    ):
+        """Like paginate, but asks the spatial index for the nearest candidates of the first pages if there is one.
+
+        An index missing entries written by another worker since its load is not used.
+        """
+        fallback = self.paginate(page_info, coordinate)
+
+        def __internal(query: CachedStatement) -> Result[Page[EntryDbModel], Exception]:
+            spatial_index = get_spatial_index(self.db)
+            if coordinate is None or spatial_index is None or page_info.cursor is not None:
+                return fallback(query)
+            if not spatial_index.is_current(self.db):
+                return fallback(query)
+
+            skip = page_info.skip
+            end = skip + page_info.limit
+            # One more than the page to know whether there is a next one
+            needed = end + 1
+            min_warning_level = WarningLevel.from_(warning_level).value
+
+            # The index only knows the public visibility, so grow the candidates
+            # until the remaining filters of the query leave enough of them
+            k = needed
+            while True:
+                candidates = spatial_index.nearest(coordinate, k, min_warning_level, max_distance_km)
+                entries = query.then(
+                    "candidates",
+                    lambda statement: statement.where(EntryDbModel.id.in_(bindparam("candidate_ids", expanding=True))),
+                    candidate_ids=candidates,
+                ).all(self.db)
+                if len(entries) >= needed or len(candidates) < k:
+                    break
+                if k >= MAX_NEAREST_CANDIDATES:
+                    return fallback(query)
+                k *= 4
+
+            rank = {entry_id: position for position, entry_id in enumerate(candidates)}
+            entries.sort(key=lambda entry: rank[entry.id])  # type: ignore
+            if len(entries) < needed:
+                return Ok(Page(entries[skip:end]))
+
+            # The following pages continue in SQL, so the cursor needs the distance as SQL computes it
+            return Ok(Page(entries[skip:end], self._distance_cursor(coordinate, entries[end - 1].id)))
+
+        return __internal
+
+    def sync_spatial_index(self):
+        def __internal(entry: EntryDbModel) -> EntryDbModel:
+            spatial_index = get_spatial_index(self.db)
+            if spatial_index is not None:
+                spatial_index.sync(entry)
+            return entry
 
         return __internal
 
@@ -48,11 +416,13 @@ class EntryCRUD:
         def __internal(entry: EntryDbModel) -> EntryDbModel:
             hidden_entry = self.db.query(HiddenEntry).filter_by(entry_id=entry.id, user_id=user_id).first()
             if not hidden_entry:
-                hidden_entry = HiddenEntry(entry_id=entry.id, user_id=user_id)
+                now = datetime.datetime.utcnow()
+                hidden_entry = HiddenEntry(entry_id=entry.id, user_id=user_id, create_date=now, update_date=now)
                 self.db.add(hidden_entry)
 
                 if entry.user_id == user_id:
-                    entry.update_date = datetime.datetime.utcnow()
+                    entry.update_date = now
+                    entry.owner_deleted_at = now  # type: ignore
 
             if permanent:
                 entry.mark_to_delete = datetime.datetime.utcnow()
@@ -69,10 +439,34 @@ class EntryCRUD:
 
                 if entry.user_id == user_id:
                     entry.update_date = datetime.datetime.utcnow()
+                    entry.owner_deleted_at = None  # type: ignore
+            return entry
+
+        return __internal
+
+    def sync_owner_deleted(self):
+        """Copies the hidden entry of the owner to owner_deleted_at."""
+
+        def __internal(entry: EntryDbModel) -> EntryDbModel:
+            hidden_entry = self.db.query(HiddenEntry).filter_by(entry_id=entry.id, user_id=entry.user_id).first()
+            entry.owner_deleted_at = hidden_entry.update_date if hidden_entry else None  # type: ignore
             return entry
 
         return __internal
 
+    def find_owner_deleted_mismatches(self) -> Result[list[UUID], Exception]:
+        """Ids of the entries whose owner_deleted_at disagrees with the hidden entries."""
+        owner_hidden = exists().where(
+            HiddenEntry.user_id == EntryDbModel.user_id, HiddenEntry.entry_id == EntryDbModel.id
+        )
+        query = self.db.query(EntryDbModel.id).filter(
+            or_(
+                and_(EntryDbModel.owner_deleted_at.is_(None), owner_hidden),
+                and_(EntryDbModel.owner_deleted_at.is_not(None), ~owner_hidden),
+            )
+        )
+        return Ok([entry_id for entry_id, in query])
+
     def commit(self):
         def __internal(entry: EntryDbModel) -> EntryDbModel:
             self.db.commit()
@@ -109,21 +503,50 @@ class EntryCRUD:
         def __internal(entry: EntryDbModel) -> EntryDbModel:
             entry.longitude = longitude
             entry.latitude = latitude
+            entry.geohash = geohash.encode(longitude, latitude)
             return entry
 
         return __internal
 
     def set_categories(self, categories: list[str] | None):
+        """Replaces the categories of the entry, writing only the associations that changed."""
+        category_keys = list(dict.fromkeys(categories or []))
+
         def __internal(entry: EntryDbModel) -> Result[EntryDbModel, Exception]:
-            entry.clear_categories()
-            if not categories:
-                return Ok(entry)
-            for category_key in categories:
-                category = self.db.query(CategoryDbModel).get(category_key)
-                if not category:
-                    return Err(DbNotFoundError(f"Cannot find category with id {category_key}"))
+            if category_keys:
+                known_keys = set(
+                    self.db.scalars(select(CategoryDbModel.key).where(CategoryDbModel.key.in_(category_keys)))
+                )
+                for category_key in category_keys:
+                    if category_key not in known_keys:
+                        return Err(DbNotFoundError(f"Cannot find category with id {category_key}"))
+
+            # The associations reference the entry row, so a new entry has to be inserted first
+            self.db.flush()
+            current_keys = set(
+                self.db.scalars(
+                    select(CATEGORY_ASSOCIATIONS.c.category_key).where(CATEGORY_ASSOCIATIONS.c.item_id == entry.id)
+                )
+            )
 
-                entry.append_category(category)
+            removed_keys = current_keys.difference(category_keys)
+            if removed_keys:
+                self.db.execute(
+                    delete(CATEGORY_ASSOCIATIONS).where(
+                        CATEGORY_ASSOCIATIONS.c.item_id == entry.id,
+                        CATEGORY_ASSOCIATIONS.c.category_key.in_(removed_keys),
+                    )
+                )
+
+            added_keys = [category_key for category_key in category_keys if category_key not in current_keys]
+            if added_keys:
+                self.db.execute(
+                    insert(CATEGORY_ASSOCIATIONS),
+                    [{"item_id": entry.id, "category_key": category_key} for category_key in added_keys],
+                )
+
+            if removed_keys or added_keys:
+                self.db.expire(entry, ["categories"])
             return Ok(entry)
 
         return __internal
@@ -150,7 +573,8 @@ class EntryCRUD:
 
     def set_create_date(self, create_date: datetime.datetime | None):
         def __internal(entry: EntryDbModel) -> EntryDbModel:
-            entry.create_date = create_date
+            if create_date:
+                entry.create_date = create_date
             return entry
 
         return __internal
@@ -164,60 +588,187 @@ class EntryCRUD:
         return __internal
 
     def order_by_coordinate(self, coordinate: Coordinate | None = None):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
+        def __internal(query: CachedStatement) -> CachedStatement:
             if coordinate:
-                query = query.order_by(desc(EntryDbModel.calc_distance(coordinate.longitude, coordinate.latitude)))
+                postgis = has_postgis(self.db)
+                query = query.then(
+                    ("order_by_coordinate", postgis),
+                    lambda statement: statement.order_by(self.distance_to(postgis)),
+                    longitude=coordinate.longitude,
+                    latitude=coordinate.latitude,
+                )
             return query
 
         return __internal
 
+    def filter_by_bounding_box(self, bounding_box: BoundingBox | None = None):
+        def __internal(query: CachedStatement) -> CachedStatement:
+            if bounding_box is None:
+                return query
+
+            def build(statement):
+                min_longitude, max_longitude = bindparam("min_longitude"), bindparam("max_longitude")
+                if bounding_box.crosses_antimeridian:
+                    longitude_filter = or_(
+                        EntryDbModel.longitude >= min_longitude, EntryDbModel.longitude <= max_longitude
+                    )
+                else:
+                    longitude_filter = EntryDbModel.longitude.between(min_longitude, max_longitude)
+
+                return statement.where(
+                    longitude_filter,
+                    EntryDbModel.latitude.between(bindparam("min_latitude"), bindparam("max_latitude")),
+                )
+
+            return query.then(
+                ("bounding_box", bounding_box.crosses_antimeridian),
+                build,
+                min_longitude=bounding_box.min_longitude,
+                max_longitude=bounding_box.max_longitude,
+                min_latitude=bounding_box.min_latitude,
+                max_latitude=bounding_box.max_latitude,
+            )
+
+        return __internal
+
+    def filter_by_geohash(self, cells: set[str] | None = None):
+        def __internal(query: CachedStatement) -> CachedStatement:
+            if cells is None:
+                return query
+
+            ranges = [geohash.prefix_range(cell) for cell in sorted(cells)]
+            # The statement has one condition per cell, with or without an upper bound
+            bounded = tuple(upper is not None for _, upper in ranges)
+
+            def build(statement):
+                cell_filters = []
+                for i, has_upper in enumerate(bounded):
+                    cell_filter = EntryDbModel.geohash >= bindparam(f"cell_lower_{i}")
+                    if has_upper:
+                        cell_filter = and_(cell_filter, EntryDbModel.geohash < bindparam(f"cell_upper_{i}"))
+                    cell_filters.append(cell_filter)
+                return statement.where(or_(*cell_filters))
+
+            params = {}
+            for i, (lower, upper) in enumerate(ranges):
+                params[f"cell_lower_{i}"] = lower
+                params[f"cell_upper_{i}"] = upper
+            return query.then(("geohash", bounded), build, **params)
+
+        return __internal
+
+    def filter_by_distance(self, coordinate: Coordinate | None = None, max_distance_km: float | None = None):
+        def __internal(query: CachedStatement) -> CachedStatement:
+            if coordinate is None or max_distance_km is None:
+                return query
+
+            longitude, latitude = bindparam("longitude", type_=Double), bindparam("latitude", type_=Double)
+            postgis = has_postgis(self.db)
+            # Narrow the candidates with an index first, the exact distance only refines them
+            if postgis:
+                # The sphere of PostGIS is smaller than EARTH_RADIUS_KM, so this keeps every candidate
+                query = query.then(
+                    "within_distance",
+                    lambda statement: statement.where(
+                        func.ST_DWithin(
+                            ENTRIES_LOCATION, geography_point(longitude, latitude), bindparam("max_distance_m"), False
+                        )
+                    ),
+                    max_distance_m=max_distance_km * 1000,
+                )
+            else:
+                query = self.filter_by_geohash(geohash.cover(coordinate, max_distance_km))(query)
+                query = self.filter_by_bounding_box(coordinate.bounding_box(max_distance_km))(query)
+            return query.then(
+                "distance",
+                lambda statement: statement.where(
+                    EntryDbModel.calc_distance(longitude, latitude) <= bindparam("max_distance_km")  # type: ignore
+                ),
+                longitude=coordinate.longitude,
+                latitude=coordinate.latitude,
+                max_distance_km=max_distance_km,
+            )
+
+        return __internal
+
     def filter_by_date_from(self, date_from: datetime.datetime | None = None):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
+        def __internal(query: CachedStatement) -> CachedStatement:
             if date_from is not None:
-                query = query.filter(EntryDbModel.update_date >= date_from)
+                query = query.then(
+                    "date_from",
+                    lambda statement: statement.where(EntryDbModel.update_date >= bindparam("date_from")),
+                    date_from=date_from,
+                )
             return query
 
         return __internal
 
     def filter_by_warning_level(self, warning_level: WarningLevel | warning_levels | None = None):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
+        def __internal(query: CachedStatement) -> CachedStatement:
             level_enum = WarningLevel.from_(warning_level)
-            query = query.filter(EntryDbModel.warning_level >= level_enum.value)
+            query = query.then(
+                "warning_level",
+                lambda statement: statement.where(EntryDbModel.warning_level >= bindparam("min_warning_level")),
+                min_warning_level=level_enum.value,
+            )
             return query
 
         return __internal
 
+    def filter_by_categories(self, categories: list[str] | None = None):
+        def __internal(query: CachedStatement) -> CachedStatement:
+            if not categories:
+                return query
+            # Semi-join through the (category_key, item_id) index, entries with several matches stay single rows
+            return query.then(
+                "categories",
+                lambda statement: statement.where(
+                    exists().where(
+                        CATEGORY_ASSOCIATIONS.c.item_id == EntryDbModel.id,
+                        CATEGORY_ASSOCIATIONS.c.category_key.in_(bindparam("categories", expanding=True)),
+                    )
+                ),
+                categories=categories,
+            )
+
+        return __internal
+
     def filter_by_user(self, user_id: UUID):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
-            # noinspection PyTypeChecker
-            query = query.filter(EntryDbModel.user_id == user_id)
+        def __internal(query: CachedStatement) -> CachedStatement:
+            query = query.then(
+                "user",
+                lambda statement: statement.where(EntryDbModel.user_id == bindparam("owner_id")),
+                owner_id=user_id,
+            )
             return query
 
         return __internal
 
     def filter_show_trash(self, user_id: UUID):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
-            query = query.filter(
-                exists().where(and_(HiddenEntry.user_id == user_id, HiddenEntry.entry_id == EntryDbModel.id))
+        def __internal(query: CachedStatement) -> CachedStatement:
+            # Starts from the few hidden entries of the user through their (user_id, entry_id) index
+            query = query.then(
+                "show_trash",
+                lambda statement: statement.where(
+                    EntryDbModel.id.in_(
+                        select(HiddenEntry.entry_id).where(HiddenEntry.user_id == bindparam("trash_user_id"))
+                    )
+                ),
+                trash_user_id=user_id,
             )
             return query
 
         return __internal
 
     def filter_to_delete(self, older_than: datetime.datetime | None = None):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
-            and_args = []
-            if older_than is not None:
-                and_args.append(HiddenEntry.update_date <= older_than)
-
-            query = query.filter(
-                or_(
-                    EntryDbModel.mark_to_delete.is_not(None),
-                    exists().where(
-                        HiddenEntry.user_id == EntryDbModel.user_id, HiddenEntry.entry_id == EntryDbModel.id, *and_args
-                    ),
-                )
-            )
+        def __internal(query: CachedStatement) -> CachedStatement:
+            def build(statement):
+                owner_deleted = EntryDbModel.owner_deleted_at.is_not(None)
+                if older_than is not None:
+                    owner_deleted = EntryDbModel.owner_deleted_at <= bindparam("owner_deleted_before")
+                return statement.where(or_(EntryDbModel.mark_to_delete.is_not(None), owner_deleted))
+
+            query = query.then(("to_delete", older_than is not None), build, owner_deleted_before=older_than)
             return query
 
         return __internal
@@ -225,40 +776,63 @@ class EntryCRUD:
     def filter_owner_deleted(self, ignore_ids: list[UUID] | None = None):
         ignore_ids = ignore_ids or list()
 
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
-            query = query.filter(
-                or_(
-                    EntryDbModel.user_id.in_(ignore_ids),
-                    ~exists().where(
-                        and_(HiddenEntry.user_id == EntryDbModel.user_id, HiddenEntry.entry_id == EntryDbModel.id)
-                    ),
+        def __internal(query: CachedStatement) -> CachedStatement:
+            # Without ignored users the predicate matches the partial indexes of the live entries
+            if not ignore_ids:
+                return query.then(
+                    "owner_deleted", lambda statement: statement.where(EntryDbModel.owner_deleted_at.is_(None))
                 )
+
+            query = query.then(
+                "owner_deleted_or_ignored",
+                lambda statement: statement.where(
+                    or_(
+                        EntryDbModel.user_id.in_(bindparam("ignore_ids", expanding=True)),
+                        EntryDbModel.owner_deleted_at.is_(None),
+                    )
+                ),
+                ignore_ids=ignore_ids,
             )
             return query
 
         return __internal
 
     def filter_user_deleted(self, user_id: UUID | None = None):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
+        def __internal(query: CachedStatement) -> CachedStatement:
             if user_id:
-                query = query.filter(
-                    ~exists().where(and_(HiddenEntry.user_id == user_id, HiddenEntry.entry_id == EntryDbModel.id))
+                query = query.then(
+                    "user_deleted",
+                    lambda statement: statement.where(
+                        ~exists().where(
+                            and_(
+                                HiddenEntry.user_id == bindparam("hidden_user_id"),
+                                HiddenEntry.entry_id == EntryDbModel.id,
+                            )
+                        )
+                    ),
+                    hidden_user_id=user_id,
                 )
             return query
 
         return __internal
 
     def filter_marked_to_delete(self):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
-            query = query.filter(is_(EntryDbModel.mark_to_delete, None))
+        def __internal(query: CachedStatement) -> CachedStatement:
+            query = query.then(
+                "marked_to_delete", lambda statement: statement.where(EntryDbModel.mark_to_delete.is_(None))
+            )
             return query
 
         return __internal
 
     def filter_older_than(self, older_than: datetime.datetime | None = None):
-        def __internal(query: Query[Type[EntryDbModel]]) -> Query[Type[EntryDbModel]]:
+        def __internal(query: CachedStatement) -> CachedStatement:
             if older_than is None:
                 return query
-            return query.filter(EntryDbModel.update_date <= older_than)
+            return query.then(
+                "older_than",
+                lambda statement: statement.where(EntryDbModel.update_date <= bindparam("updated_before")),
+                updated_before=older_than,
+            )
 
         return __internal
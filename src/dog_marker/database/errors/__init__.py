@@ -1,3 +1,4 @@
-__all__ = ["DbNotFoundError"]
+__all__ = ["DbNotFoundError", "DbInvalidCursorError"]
 
 from .not_found_error import DbNotFoundError
+from .invalid_cursor_error import DbInvalidCursorError
@@ -0,0 +1,3 @@
+class DbInvalidCursorError(Exception):
+    def __init__(self, msg: str):
+        self.msg = msg
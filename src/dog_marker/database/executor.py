@@ -0,0 +1,102 @@
+__all__ = ["SessionExecutor", "QueueWaitStats", "track_queue_wait", "current_queue_wait_stats"]
+
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Iterator, TypeVar
+
+R = TypeVar("R")
+
+_current_stats: ContextVar["QueueWaitStats | None"] = ContextVar("queue_wait_stats", default=None)
+
+
+class QueueWaitStats:
+    """Count of the calls run on a SessionExecutor and how long they waited for a free thread."""
+
+    def __init__(self, parent: "QueueWaitStats | None" = None):
+        self.parent = parent
+        self.count = 0
+        self.total_ms = 0.0
+        self.longest_ms = 0.0
+
+    def record(self, wait_ms: float) -> None:
+        stats: QueueWaitStats | None = self
+        while stats is not None:
+            stats.count += 1
+            stats.total_ms += wait_ms
+            stats.longest_ms = max(stats.longest_ms, wait_ms)
+            stats = stats.parent
+
+    def __repr__(self) -> str:
+        return f"{self.count} calls waited {self.total_ms:.1f} ms, longest {self.longest_ms:.1f} ms"
+
+
+def current_queue_wait_stats() -> QueueWaitStats | None:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_queue_wait() -> Iterator[QueueWaitStats]:
+    """Records the queue wait of the calls submitted in the current context, like track_statements."""
+    stats = QueueWaitStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+class SessionExecutor:
+    """Thread pool for the blocking session calls of the async endpoints, bounded by the connection pool.
+
+    With one thread per connection a call never blocks in its thread waiting for a connection, the
+    calls wait in the queue of the executor instead. Its stats show that wait over the process, the
+    stats of track_queue_wait per request. A high wait with idle CPUs means the pool is too small.
+    """
+
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self.stats = QueueWaitStats()
+        self.queued = 0
+        self.running = 0
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dog_marker-db")
+
+    async def run(self, call: Callable[[], R]) -> R:
+        """Runs call in the context of the caller, so track_statements covers it as well."""
+        context = contextvars.copy_context()
+        request_stats = _current_stats.get()
+        submitted = time.perf_counter()
+
+        def __internal() -> R:
+            wait_ms = (time.perf_counter() - submitted) * 1000
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.stats.record(wait_ms)
+            if request_stats is not None:
+                request_stats.record(wait_ms)
+            try:
+                return context.run(call)
+            finally:
+                with self._lock:
+                    self.running -= 1
+
+        with self._lock:
+            self.queued += 1
+        future = self._executor.submit(__internal)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A call cancelled before it started never leaves the queue itself
+            if future.cancel():
+                with self._lock:
+                    self.queued -= 1
+            raise
+
+    def __repr__(self) -> str:
+        return f"{self.running}/{self.max_workers} threads busy, {self.queued} calls queued, {self.stats!r}"
@@ -0,0 +1,112 @@
+__all__ = [
+    "haversine",
+    "haversine_expression",
+    "haversine_km",
+    "register_sqlite_functions",
+    "geography_point",
+    "has_postgis",
+    "detect_postgis",
+    "ENTRIES_LOCATION",
+]
+
+import math
+import sqlite3
+
+from sqlalchemy import Double, Engine, func, literal_column, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.functions import FunctionElement
+
+from ..dtypes.coordinate import EARTH_RADIUS_KM
+
+TO_RADIANS = math.pi / 180.0
+
+
+def sqlite_has_math_functions() -> bool:
+    connection = sqlite3.connect(":memory:")
+    try:
+        connection.execute("SELECT sin(0), atan2(0, 1), pow(2, 2)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        connection.close()
+    return True
+
+
+# Property of the linked SQLite library, so it holds for every connection of the process
+SQLITE_MATH_FUNCTIONS = sqlite_has_math_functions()
+
+
+def haversine_km(lat1: float | None, lon1: float | None, lat2: float | None, lon2: float | None) -> float | None:
+    # Called once per row by SQLite, so keep it to plain float arithmetic
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+
+    a = math.sin((lat2 - lat1) * TO_RADIANS / 2) ** 2 + math.sin((lon2 - lon1) * TO_RADIANS / 2) ** 2 * math.cos(
+        lat1 * TO_RADIANS
+    ) * math.cos(lat2 * TO_RADIANS)
+    return EARTH_RADIUS_KM * 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+
+def haversine_expression(lat1, lon1, lat2, lon2):
+    d_lat = (lat2 - lat1) * TO_RADIANS
+    d_lon = (lon2 - lon1) * TO_RADIANS
+
+    a = func.pow(func.sin(d_lat / 2.0), 2) + func.pow(func.sin(d_lon / 2.0), 2) * func.cos(
+        lat1 * TO_RADIANS
+    ) * func.cos(lat2 * TO_RADIANS)
+    return EARTH_RADIUS_KM * 2.0 * func.atan2(func.sqrt(a), func.sqrt(1.0 - a))
+
+
+class haversine(FunctionElement):
+    """haversine(lat1, lon1, lat2, lon2): great-circle distance in km between two coordinates in degrees.
+
+    Every backend gets the equivalent trigonometric expression, except SQLite builds without
+    the math functions, they call the python function registered by register_sqlite_functions.
+    Where SQLite has the math functions built in, the expression is faster than the python callback.
+    """
+
+    type = Double()
+    name = "haversine"
+    inherit_cache = True
+
+
+@compiles(haversine, "sqlite")
+def compile_haversine_sqlite(element, compiler, **kw):
+    if SQLITE_MATH_FUNCTIONS:
+        return compile_haversine(element, compiler, **kw)
+    return f"haversine({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(haversine)
+def compile_haversine(element, compiler, **kw):
+    return compiler.process(haversine_expression(*element.clauses), **kw)
+
+
+def register_sqlite_functions(dbapi_connection, connection_record) -> None:
+    dbapi_connection.create_function("haversine", 4, haversine_km, deterministic=True)
+
+
+# Generated geography column of the opt-in postgis migration branch, the models do not map it
+ENTRIES_LOCATION: ColumnElement = literal_column("entries.location")
+
+
+def geography_point(longitude, latitude):
+    return func.geography(func.ST_SetSRID(func.ST_MakePoint(longitude, latitude), 4326))
+
+
+def has_postgis(session: Session) -> bool:
+    return session.info.get("postgis", False)
+
+
+def detect_postgis(engine: Engine) -> bool:
+    """Whether the postgis migration branch added entries.location to the database."""
+    with engine.connect() as connection:
+        location = connection.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_schema = current_schema() AND table_name = 'entries' AND column_name = 'location'"
+            )
+        ).first()
+    return location is not None
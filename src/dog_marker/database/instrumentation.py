@@ -0,0 +1,72 @@
+__all__ = ["StatementStats", "instrument_engine", "track_statements", "current_statement_stats"]
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import Engine, event
+
+_current_stats: ContextVar["StatementStats | None"] = ContextVar("statement_stats", default=None)
+
+
+class StatementStats:
+    """Count and duration of the statements executed while it was tracked by track_statements."""
+
+    def __init__(self, parent: "StatementStats | None" = None):
+        self.parent = parent
+        self.count = 0
+        self.total_ms = 0.0
+        self.slowest_ms = 0.0
+        self.slowest_statement: str | None = None
+
+    def record(self, statement: str, duration_ms: float) -> None:
+        stats: StatementStats | None = self
+        while stats is not None:
+            stats.count += 1
+            stats.total_ms += duration_ms
+            if duration_ms >= stats.slowest_ms:
+                stats.slowest_ms = duration_ms
+                stats.slowest_statement = statement
+            stats = stats.parent
+
+    def __repr__(self) -> str:
+        return f"{self.count} statements in {self.total_ms:.1f} ms, slowest {self.slowest_ms:.1f} ms"
+
+
+def current_statement_stats() -> StatementStats | None:
+    return _current_stats.get()
+
+
+@contextmanager
+def track_statements() -> Iterator[StatementStats]:
+    """Records the statements of the current context, nested trackers also count towards the outer ones.
+
+    The stats are context local, so they cover the sync endpoints FastAPI runs in its thread pool as well:
+
+        with track_statements() as stats:
+            client.get("/v1/entries/")
+        assert stats.count <= 2
+    """
+    stats = StatementStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("statement_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["statement_start"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, (time.perf_counter() - start) * 1000)
+
+
+def instrument_engine(engine: Engine) -> None:
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
@@ -15,16 +15,26 @@ from sqlalchemy import (
     Index,
     Integer,
     ForeignKey,
+    select,
+    text,
 )
-from sqlalchemy.orm import relationship, Mapped
+from sqlalchemy.orm import relationship, Mapped, column_property
 
 from .hidden_entry import HiddenEntry
 from .mixin.category_mixin import CategoryMixin
 from ..base import Base
+from ..functions import haversine
+from ...dtypes.geohash import GEOHASH_PRECISION
+
+
+# Public listings only show entries that are neither marked to delete nor deleted by their owner
+LIVE_ENTRIES = text("mark_to_delete IS NULL AND owner_deleted_at IS NULL")
+OWNER_DELETED = text("owner_deleted_at IS NOT NULL")
 
 
 class EntryImageDbModel(Base):
     __tablename__ = "entry_images"
+    __table_args__ = (Index("ix_entry_images_entry_id", "entry_id", "id"),)
     id = Column(Integer, primary_key=True, autoincrement=True)
 
     entry_id: UUID = Column(ForeignKey("entries.id", ondelete="CASCADE"), nullable=False)
@@ -45,6 +55,30 @@ class EntryDbModel(Base, CategoryMixin):
     __tablename__ = "entries"
     __table_args__ = (
         Index("ix_entries_coordinates", "longitude", "latitude"),
+        Index(
+            "ix_entries_live_update_date", "update_date", "id", postgresql_where=LIVE_ENTRIES, sqlite_where=LIVE_ENTRIES
+        ),
+        Index(
+            "ix_entries_live_user_id",
+            "user_id",
+            "update_date",
+            "id",
+            postgresql_where=LIVE_ENTRIES,
+            sqlite_where=LIVE_ENTRIES,
+        ),
+        Index(
+            "ix_entries_live_warning_level",
+            "warning_level",
+            "update_date",
+            postgresql_where=LIVE_ENTRIES,
+            sqlite_where=LIVE_ENTRIES,
+        ),
+        Index(
+            "ix_entries_owner_deleted_at",
+            "owner_deleted_at",
+            postgresql_where=OWNER_DELETED,
+            sqlite_where=OWNER_DELETED,
+        ),
         CheckConstraint("warning_level >= 0 and warning_level <= 2 ", name="check_warning_level"),
         CheckConstraint("longitude >= -180 and longitude <= 180 ", name="check_longitude"),
         CheckConstraint("latitude >= -90 and latitude <= 90 ", name="check_latitude"),
@@ -59,6 +93,10 @@ class EntryDbModel(Base, CategoryMixin):
     mark_to_delete = Column(
         DateTime(timezone=True),
     )
+    # Copy of the hidden entry of the owner, kept in sync by EntryCRUD.delete and undo_delete
+    owner_deleted_at = Column(
+        DateTime(timezone=True),
+    )
 
     hidden_entries: Mapped[list[HiddenEntry]] = relationship("HiddenEntry", cascade="all,delete")
 
@@ -70,6 +108,7 @@ class EntryDbModel(Base, CategoryMixin):
 
     longitude = Column(Double, nullable=False)
     latitude = Column(Double, nullable=False)
+    geohash = Column(String(GEOHASH_PRECISION), index=True, nullable=False)
 
     create_date = Column(
         DateTime(timezone=True),
@@ -85,29 +124,24 @@ class EntryDbModel(Base, CategoryMixin):
         onupdate=datetime.now,
     )
 
-    @property
-    def is_deleted(self) -> bool:
-        for h_entry in self.hidden_entries:
-            if h_entry.user_id == self.user_id and h_entry.entry_id == self.id:
-                return True
-        return False
-
-    @property
-    def image_path(self) -> str | None:
-        return self.image_infos[0].image_path if self.image_infos else None
-
-    @property
-    def image_delete_url(self) -> str | None:
-        return self.image_infos[0].image_delete_url if self.image_infos else None
-
-    @staticmethod  # Todo: Right Methode in sqlalchemey
-    def calc_distance(longitude, latitude):
-        d_lat = EntryDbModel.latitude - latitude
-        d_lon = EntryDbModel.longitude - longitude
-
-        a = func.pow(func.sin(d_lat / 2.0), 2) + func.pow(func.sin(d_lon / 2.0), 2) * func.cos(latitude) * func.cos(
-            EntryDbModel.latitude
-        )
-        dist = 6378.388 * 2.0 * func.atan2(func.sqrt(a), func.sqrt(1.0 - a))
+    # Selected with the entry, so reading them does not load the hidden entries or the image history
+    is_deleted: Mapped[bool] = column_property(owner_deleted_at.is_not(None))
+    image_path: Mapped[str | None] = column_property(
+        select(EntryImageDbModel.image_path)
+        .where(EntryImageDbModel.entry_id == id)
+        .order_by(EntryImageDbModel.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
+    image_delete_url: Mapped[str | None] = column_property(
+        select(EntryImageDbModel.image_delete_url)
+        .where(EntryImageDbModel.entry_id == id)
+        .order_by(EntryImageDbModel.id.desc())
+        .limit(1)
+        .scalar_subquery()
+    )
 
-        return dist
+    @staticmethod
+    def calc_distance(longitude: float, latitude: float):
+        """Great-circle (haversine) distance in km between the entry and the given coordinate."""
+        return haversine(EntryDbModel.latitude, EntryDbModel.longitude, latitude, longitude)
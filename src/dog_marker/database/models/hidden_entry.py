@@ -1,13 +1,17 @@
 from datetime import datetime
 
-from sqlalchemy import Column, UUID, ForeignKey, PrimaryKeyConstraint, DateTime, func
+from sqlalchemy import Column, UUID, ForeignKey, PrimaryKeyConstraint, DateTime, func, Index
 
 from ..base import Base
 
 
 class HiddenEntry(Base):
     __tablename__ = "hidden_entries"
-    __table_args__ = (PrimaryKeyConstraint("entry_id", "user_id"),)
+    __table_args__ = (
+        PrimaryKeyConstraint("entry_id", "user_id"),
+        # The primary key leads with entry_id, the trash of a user is looked up by user_id
+        Index("ix_hidden_entries_user_id_entry_id", "user_id", "entry_id"),
+    )
 
     entry_id: UUID = Column(ForeignKey("entries.id", ondelete="CASCADE"), nullable=False)
     user_id: UUID = Column(UUID(as_uuid=True), nullable=False)  # type: ignore
@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, ForeignKey
+from sqlalchemy import Table, Column, ForeignKey, Index
 from sqlalchemy.orm import declared_attr, relationship, Mapped
 
 from dog_marker.database.base import Base
@@ -18,12 +18,14 @@ class CategoryMixin:
         association_table = Table(
             f"{table_name}_categories_associations",  # type: ignore
             Base.metadata,
-            Column("item_id", ForeignKey(f"{table_name}.id", ondelete="CASCADE"), nullable=False),  # type: ignore
-            Column("category_key", ForeignKey("categories.key", ondelete="CASCADE"), nullable=False),
+            Column("item_id", ForeignKey(f"{table_name}.id", ondelete="CASCADE"), primary_key=True),  # type: ignore
+            Column("category_key", ForeignKey("categories.key", ondelete="CASCADE"), primary_key=True),
+            # Reverse of the primary key for filtering entries by category
+            Index(f"ix_{table_name}_categories_associations_category_key", "category_key", "item_id"),
         )
 
         # noinspection PyTypeChecker
-        return relationship("CategoryDbModel", lazy="dynamic", secondary=association_table)  # type: ignore
+        return relationship("CategoryDbModel", secondary=association_table)  # type: ignore
 
     def append_category(self, category: CategoryDbModel):
         self.categories.append(category)
@@ -33,5 +35,4 @@ class CategoryMixin:
             self.append_category(cat)
 
     def clear_categories(self):
-        for cat in self.categories:
-            self.categories.remove(cat)
+        self.categories.clear()
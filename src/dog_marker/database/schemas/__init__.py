@@ -1,8 +1,12 @@
 __all__ = [
     "Category",
+    "EntryCluster",
+    "EntryRow",
     "WarningLevel",
     "warning_levels",
 ]
 
 from .category import Category
+from .entry_cluster import EntryCluster
+from .entry_row import EntryRow
 from .warning_level import WarningLevel, warning_levels
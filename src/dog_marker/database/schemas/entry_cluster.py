@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+
+
+class EntryCluster(BaseModel):
+    geohash: str
+    longitude: float
+    latitude: float
+    count: int
+    warning_level: int
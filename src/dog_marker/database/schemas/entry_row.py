@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import NamedTuple
+from uuid import UUID
+
+from .category import Category
+
+
+class EntryRow(NamedTuple):
+    """Read-only projection of an entry with the fields of its API representation."""
+
+    id: UUID
+    user_id: UUID
+    title: str
+    description: str | None
+    image_path: str | None
+    image_delete_url: str | None
+    longitude: float
+    latitude: float
+    warning_level: int
+    create_date: datetime
+    update_date: datetime
+    is_deleted: bool
+    categories: tuple[Category, ...] = ()
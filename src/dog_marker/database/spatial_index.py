@@ -0,0 +1,306 @@
+__all__ = ["SpatialIndex", "get_spatial_index"]
+
+import datetime
+import heapq
+import math
+import threading
+from uuid import UUID
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .models import EntryDbModel
+from ..dtypes.coordinate import Coordinate, EARTH_RADIUS_KM
+
+LEAF_SIZE = 32
+
+
+def get_spatial_index(session: Session) -> "SpatialIndex | None":
+    return session.info.get("spatial_index")
+
+
+def to_unit_vector(longitude: float, latitude: float) -> np.ndarray:
+    lon, lat = math.radians(longitude), math.radians(latitude)
+    return np.array([math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat)])
+
+
+def to_unit_vectors(longitudes: np.ndarray, latitudes: np.ndarray) -> np.ndarray:
+    lon, lat = np.radians(longitudes), np.radians(latitudes)
+    return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+
+class SpatialIndex:
+    """In-process KD-tree over the coordinates of all visible entries.
+
+    Points live on the unit sphere, so the euclidean (chord) distance grows with the
+    great-circle distance and the nearest points are the same as with calc_distance.
+    New or moved entries are kept in a small pending buffer and removed ones are
+    tombstoned until enough changes piled up to rebuild the tree.
+
+    Every process has its own index and only syncs its own writes, the writes of other
+    workers show up with the next load. Until then is_current tells that the index misses them.
+    """
+
+    def __init__(self, rebuild_threshold: int = 1024):
+        self.rebuild_threshold = rebuild_threshold
+        self._lock = threading.RLock()
+
+        self._ids: list[UUID] = []
+        self._positions: dict[UUID, int] = {}
+        self._points = np.empty((0, 3))
+        self._warning_levels = np.empty(0, dtype=np.int8)
+        self._alive = np.empty(0, dtype=bool)
+        self._dead = 0
+
+        # Append-only buffer for entries added since the last build
+        self._pending_ids: list[UUID] = []
+        self._pending_positions: dict[UUID, int] = {}
+        self._pending_points = np.empty((16, 3))
+        self._pending_warning_levels = np.empty(16, dtype=np.int8)
+        self._pending_alive = np.zeros(16, dtype=bool)
+
+        self._starts: list[int] = []
+        self._ends: list[int] = []
+        self._children: list[tuple[int, int] | None] = []
+        self._mins = np.empty((0, 3))
+        self._maxs = np.empty((0, 3))
+
+        # Changes made while a load reads the entries, replayed after its build. None removes the entry.
+        self._journals: list[dict[UUID, tuple[float, float, int] | None]] = []
+
+        # Newest update_date of the loaded entries and the entries synced since then
+        self._loaded_until: datetime.datetime | None = None
+        self._synced: set[UUID] = set()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._positions) + len(self._pending_positions)
+
+    def __contains__(self, entry_id: UUID) -> bool:
+        with self._lock:
+            return entry_id in self._positions or entry_id in self._pending_positions
+
+    def load(self, session: Session) -> None:
+        """Rebuilds the index from all entries that are neither marked to delete nor deleted by their owner.
+
+        The entries are read without holding the lock, the syncs made meanwhile are journaled and
+        replayed after the build, so the snapshot of the read does not undo them.
+        """
+        journal: dict[UUID, tuple[float, float, int] | None] = {}
+        with self._lock:
+            self._journals.append(journal)
+        try:
+            rows = session.execute(
+                select(
+                    EntryDbModel.id,
+                    EntryDbModel.longitude,
+                    EntryDbModel.latitude,
+                    EntryDbModel.warning_level,
+                    EntryDbModel.update_date,
+                ).where(EntryDbModel.mark_to_delete.is_(None), EntryDbModel.owner_deleted_at.is_(None))
+            ).all()
+
+            ids = [row[0] for row in rows]
+            longitudes = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+            latitudes = np.fromiter((row[2] for row in rows), dtype=float, count=len(rows))
+            warning_levels = np.fromiter((row[3] for row in rows), dtype=np.int8, count=len(rows))
+
+            with self._lock:
+                self._build(ids, to_unit_vectors(longitudes, latitudes), warning_levels)
+                for entry_id, change in journal.items():
+                    if change is None:
+                        self._tombstone(entry_id)
+                    else:
+                        self._insert(entry_id, *change)
+                self._rebuild_if_needed()
+                self._loaded_until = max((row[4] for row in rows), default=None)
+                self._synced = {entry_id for entry_id, change in journal.items() if change is not None}
+        finally:
+            with self._lock:
+                self._journals.remove(journal)
+
+    def is_current(self, session: Session) -> bool:
+        """Whether every visible entry written since the load was synced to this index.
+
+        Entries written by other workers are missing until the next load, the nearest ones
+        have to be found in SQL meanwhile. The update_date index keeps the check cheap.
+        """
+        with self._lock:
+            loaded_until = self._loaded_until
+        statement = select(EntryDbModel.id).where(
+            EntryDbModel.mark_to_delete.is_(None), EntryDbModel.owner_deleted_at.is_(None)
+        )
+        if loaded_until is not None:
+            statement = statement.where(EntryDbModel.update_date > loaded_until)
+        written = session.scalars(statement).all()
+        with self._lock:
+            return all(entry_id in self._synced for entry_id in written)
+
+    def sync(self, entry: EntryDbModel) -> None:
+        """Adds, moves or removes the entry depending on whether it is still publicly visible."""
+        if entry.mark_to_delete is None and not entry.is_deleted:
+            self.upsert(entry.id, entry.longitude, entry.latitude, entry.warning_level or 0)  # type: ignore
+        else:
+            self.remove(entry.id)  # type: ignore
+
+    def upsert(self, entry_id: UUID, longitude: float, latitude: float, warning_level: int = 0) -> None:
+        with self._lock:
+            for journal in self._journals:
+                journal[entry_id] = (longitude, latitude, warning_level)
+            self._synced.add(entry_id)
+            self._insert(entry_id, longitude, latitude, warning_level)
+            self._rebuild_if_needed()
+
+    def remove(self, entry_id: UUID) -> None:
+        with self._lock:
+            for journal in self._journals:
+                journal[entry_id] = None
+            self._synced.discard(entry_id)
+            self._tombstone(entry_id)
+            self._rebuild_if_needed()
+
+    def nearest(
+        self,
+        coordinate: Coordinate,
+        k: int,
+        min_warning_level: int = 0,
+        max_distance_km: float | None = None,
+    ) -> list[UUID]:
+        """Ids of the k nearest visible entries ordered by distance."""
+        point = to_unit_vector(coordinate.longitude, coordinate.latitude)
+        max_chord2 = math.inf
+        if max_distance_km is not None:
+            max_chord2 = (2 * math.sin(min(max_distance_km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+
+        with self._lock:
+            # Max-heap of the best k candidates as (-squared distance, id)
+            best: list[tuple[float, UUID]] = []
+
+            count = len(self._pending_ids)
+            if count:
+                distances2 = ((self._pending_points[:count] - point) ** 2).sum(axis=1)
+                mask = self._pending_alive[:count] & (self._pending_warning_levels[:count] >= min_warning_level)
+                candidates = np.flatnonzero(mask & (distances2 <= max_chord2))
+                if len(candidates) > k:
+                    candidates = candidates[np.argpartition(distances2[candidates], k - 1)[:k]]
+                for position in candidates:
+                    self._offer(best, k, float(distances2[position]), max_chord2, self._pending_ids[position])
+
+            if self._children:
+                self._search(best, k, point, min_warning_level, max_chord2)
+
+        return [entry_id for _, entry_id in sorted(best, reverse=True)]
+
+    def _offer(self, best: list[tuple[float, UUID]], k: int, distance2: float, max_chord2: float, entry_id: UUID):
+        if distance2 > max_chord2:
+            return
+        item = (-distance2, entry_id)
+        if len(best) < k:
+            heapq.heappush(best, item)
+        elif distance2 < -best[0][0]:
+            heapq.heapreplace(best, item)
+
+    def _search(self, best, k: int, point: np.ndarray, min_warning_level: int, max_chord2: float) -> None:
+        nodes = [(0.0, 0)]
+        while nodes:
+            node_distance2, node = heapq.heappop(nodes)
+            if node_distance2 > max_chord2 or (len(best) == k and node_distance2 > -best[0][0]):
+                break
+
+            children = self._children[node]
+            if children is None:
+                start, end = self._starts[node], self._ends[node]
+                distances2 = ((self._points[start:end] - point) ** 2).sum(axis=1)
+                mask = self._alive[start:end] & (self._warning_levels[start:end] >= min_warning_level)
+                for offset in np.flatnonzero(mask):
+                    self._offer(best, k, float(distances2[offset]), max_chord2, self._ids[start + offset])
+                continue
+
+            for child in children:
+                gap = np.maximum(self._mins[child] - point, 0) + np.maximum(point - self._maxs[child], 0)
+                heapq.heappush(nodes, (float(gap @ gap), child))
+
+    def _insert(self, entry_id: UUID, longitude: float, latitude: float, warning_level: int) -> None:
+        self._tombstone(entry_id)
+
+        position = len(self._pending_ids)
+        if position == len(self._pending_alive):
+            self._grow_pending()
+
+        self._pending_ids.append(entry_id)
+        self._pending_positions[entry_id] = position
+        self._pending_points[position] = to_unit_vector(longitude, latitude)
+        self._pending_warning_levels[position] = warning_level
+        self._pending_alive[position] = True
+
+    def _tombstone(self, entry_id: UUID) -> None:
+        position = self._positions.pop(entry_id, None)
+        if position is not None:
+            self._alive[position] = False
+            self._dead += 1
+
+        pending_position = self._pending_positions.pop(entry_id, None)
+        if pending_position is not None:
+            self._pending_alive[pending_position] = False
+
+    def _grow_pending(self) -> None:
+        capacity = len(self._pending_alive) * 2
+        self._pending_points = np.resize(self._pending_points, (capacity, 3))
+        self._pending_warning_levels = np.resize(self._pending_warning_levels, capacity)
+        self._pending_alive = np.concatenate([self._pending_alive, np.zeros(capacity // 2, dtype=bool)])
+
+    def _rebuild_if_needed(self) -> None:
+        if len(self._pending_ids) + self._dead <= max(self.rebuild_threshold, len(self._ids) // 8):
+            return
+
+        alive = np.flatnonzero(self._alive)
+        pending_alive = np.flatnonzero(self._pending_alive[: len(self._pending_ids)])
+
+        ids = [self._ids[position] for position in alive] + [self._pending_ids[p] for p in pending_alive]
+        points = np.concatenate([self._points[alive], self._pending_points[pending_alive]])
+        warning_levels = np.concatenate([self._warning_levels[alive], self._pending_warning_levels[pending_alive]])
+
+        self._build(ids, points, warning_levels)
+
+    def _build(self, ids: list[UUID], points: np.ndarray, warning_levels: np.ndarray) -> None:
+        order = np.arange(len(ids))
+        self._starts, self._ends, self._children = [], [], []
+        mins: list[np.ndarray] = []
+        maxs: list[np.ndarray] = []
+
+        def build_node(start: int, end: int) -> int:
+            node = len(self._starts)
+            node_points = points[order[start:end]]
+            box_min, box_max = node_points.min(axis=0), node_points.max(axis=0)
+
+            self._starts.append(start)
+            self._ends.append(end)
+            self._children.append(None)
+            mins.append(box_min)
+            maxs.append(box_max)
+
+            if end - start > LEAF_SIZE:
+                axis = int(np.argmax(box_max - box_min))
+                middle = (start + end) // 2
+                partition = np.argpartition(node_points[:, axis], middle - start)
+                order[start:end] = order[start:end][partition]
+                self._children[node] = (build_node(start, middle), build_node(middle, end))
+
+            return node
+
+        if len(ids):
+            build_node(0, len(ids))
+
+        self._ids = [ids[position] for position in order]
+        self._positions = {entry_id: position for position, entry_id in enumerate(self._ids)}
+        self._points = points[order].reshape(-1, 3)
+        self._warning_levels = warning_levels[order]
+        self._alive = np.ones(len(ids), dtype=bool)
+        self._dead = 0
+        self._mins = np.array(mins).reshape(-1, 3)
+        self._maxs = np.array(maxs).reshape(-1, 3)
+
+        self._pending_ids = []
+        self._pending_positions = {}
+        self._pending_alive[:] = False
@@ -1,8 +1,12 @@
-__all__ = ["Longitude", "Latitude", "Coordinate"]
+__all__ = ["Longitude", "Latitude", "Distance", "Zoom", "Coordinate", "BoundingBox", "EARTH_RADIUS_KM"]
+
+import math
 
 from pydantic import AfterValidator, BaseModel
 from typing_extensions import Annotated
 
+EARTH_RADIUS_KM = 6378.388
+
 
 def check_longitude(value: float):
     assert -180 <= value <= 180, "longitude must be between -180° and 180°"
@@ -14,10 +18,66 @@ def check_Latitude(value: float):
     return value
 
 
+def check_distance(value: float):
+    assert value > 0, "distance must be greater than 0"
+    return value
+
+
+def check_zoom(value: int):
+    assert 0 <= value <= 22, "zoom must be between 0 and 22"
+    return value
+
+
 Longitude = Annotated[float, AfterValidator(check_longitude)]
 Latitude = Annotated[float, AfterValidator(check_Latitude)]
+Distance = Annotated[float, AfterValidator(check_distance)]
+Zoom = Annotated[int, AfterValidator(check_zoom)]
+
+
+class BoundingBox(BaseModel):
+    min_longitude: Longitude
+    min_latitude: Latitude
+    max_longitude: Longitude
+    max_latitude: Latitude
+
+    @property
+    def crosses_antimeridian(self) -> bool:
+        return self.min_longitude > self.max_longitude
 
 
 class Coordinate(BaseModel):
     longitude: Longitude
     latitude: Latitude
+
+    def bounding_box(self, distance_km: float) -> BoundingBox:
+        """Smallest lat/lon box containing every point within distance_km of this coordinate."""
+        angular_distance = distance_km / EARTH_RADIUS_KM
+        d_lat = math.degrees(angular_distance)
+
+        min_latitude = self.latitude - d_lat
+        max_latitude = self.latitude + d_lat
+
+        if min_latitude <= -90 or max_latitude >= 90:
+            # A pole lies within the radius, so every longitude is reachable
+            return BoundingBox(
+                min_longitude=-180,
+                min_latitude=max(min_latitude, -90),
+                max_longitude=180,
+                max_latitude=min(max_latitude, 90),
+            )
+
+        d_lon = math.degrees(math.asin(math.sin(angular_distance) / math.cos(math.radians(self.latitude))))
+        min_longitude = self.longitude - d_lon
+        max_longitude = self.longitude + d_lon
+
+        if min_longitude < -180:
+            min_longitude += 360
+        if max_longitude > 180:
+            max_longitude -= 360
+
+        return BoundingBox(
+            min_longitude=min_longitude,
+            min_latitude=min_latitude,
+            max_longitude=max_longitude,
+            max_latitude=max_latitude,
+        )
@@ -0,0 +1,103 @@
+__all__ = ["GEOHASH_PRECISION", "encode", "cell_size", "neighbours", "prefix_range", "cover", "precision_for_zoom"]
+
+import math
+
+from .coordinate import Coordinate
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 10
+
+
+def encode(longitude: float, latitude: float, precision: int = GEOHASH_PRECISION) -> str:
+    min_longitude, max_longitude = -180.0, 180.0
+    min_latitude, max_latitude = -90.0, 90.0
+
+    geohash: list[str] = []
+    bits = 0
+    bit_count = 0
+    is_longitude = True
+
+    while len(geohash) < precision:
+        if is_longitude:
+            middle = (min_longitude + max_longitude) / 2
+            if longitude >= middle:
+                bits = bits * 2 + 1
+                min_longitude = middle
+            else:
+                bits = bits * 2
+                max_longitude = middle
+        else:
+            middle = (min_latitude + max_latitude) / 2
+            if latitude >= middle:
+                bits = bits * 2 + 1
+                min_latitude = middle
+            else:
+                bits = bits * 2
+                max_latitude = middle
+
+        is_longitude = not is_longitude
+        bit_count += 1
+
+        if bit_count == 5:
+            geohash.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def cell_size(precision: int) -> tuple[float, float]:
+    """Width and height in degrees of a cell with the given precision."""
+    bits = precision * 5
+    longitude_bits = math.ceil(bits / 2)
+    latitude_bits = bits // 2
+    return 360 / 2**longitude_bits, 180 / 2**latitude_bits
+
+
+def neighbours(coordinate: Coordinate, precision: int) -> set[str]:
+    """The cell containing the coordinate and its (up to) eight surrounding cells."""
+    width, height = cell_size(precision)
+
+    cells = set()
+    for d_lat in (-1, 0, 1):
+        latitude = coordinate.latitude + d_lat * height
+        if not -90 <= latitude <= 90:
+            continue
+        for d_lon in (-1, 0, 1):
+            longitude = (coordinate.longitude + d_lon * width + 180) % 360 - 180
+            cells.add(encode(longitude, latitude, precision))
+
+    return cells
+
+
+def prefix_range(prefix: str) -> tuple[str, str | None]:
+    """Half-open range [lower, upper) of all geohashes starting with prefix, upper is None if unbounded."""
+    stripped = prefix.rstrip(BASE32[-1])
+    if not stripped:
+        return prefix, None
+
+    upper = stripped[:-1] + BASE32[BASE32.index(stripped[-1]) + 1]
+    return prefix, upper
+
+
+def cover(coordinate: Coordinate, distance_km: float) -> set[str] | None:
+    """Cells that together contain every point within distance_km, None if no cell level is coarse enough."""
+    bounding_box = coordinate.bounding_box(distance_km)
+    if bounding_box.min_longitude == -180 and bounding_box.max_longitude == 180:
+        return None
+
+    d_lon = (bounding_box.max_longitude - coordinate.longitude) % 360
+    d_lat = bounding_box.max_latitude - coordinate.latitude
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        width, height = cell_size(precision)
+        if width >= d_lon and height >= d_lat:
+            return neighbours(coordinate, precision)
+
+    return None
+
+
+def precision_for_zoom(zoom: int) -> int:
+    """Cell level with roughly four cells per web map tile side at the given zoom."""
+    longitude_bits = zoom + 2
+    return max(1, min(GEOHASH_PRECISION, round(longitude_bits * 2 / 5)))
@@ -1,9 +1,13 @@
-__all__ = ["Pagination", "SkipInt", "LimitInt"]
+__all__ = ["Pagination", "Page", "SkipInt", "LimitInt", "encode_cursor", "decode_cursor"]
 
-from typing import Annotated
+import base64
+import json
+from typing import Annotated, Any, Generic, Iterable, TypeVar
 
 from pydantic import BaseModel, AfterValidator
 
+T = TypeVar("T")
+
 
 def check_skip_int(value: int):
     assert value >= 0, "skip >= 0"
@@ -22,3 +26,27 @@ LimitInt = Annotated[int, AfterValidator(check_limit_int)]
 class Pagination(BaseModel):
     skip: SkipInt
     limit: LimitInt
+    cursor: str | None = None
+
+
+class Page(list[T], Generic[T]):
+    """Items of one page and the cursor of the next one, None on the last page."""
+
+    def __init__(self, items: Iterable[T] = (), next_cursor: str | None = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def encode_cursor(*values: Any) -> str:
+    """Opaque token of the sort key of the last item of a page."""
+    data = json.dumps(values, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> list[Any]:
+    """Sort key of an encode_cursor token, raises ValueError if the token is malformed."""
+    padding = "=" * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(cursor + padding))
+    if not isinstance(values, list):
+        raise ValueError("cursor must contain a list")
+    return values
@@ -1,48 +1,237 @@
-__all__ = ["register_middlewares"]
+__all__ = ["register_middlewares", "RequestStateMiddleware", "CompressionMiddleware", "negotiate_encoding"]
 
-import functools
+import logging
+import zlib
+from collections import OrderedDict
 from typing import Callable
 
-from fastapi import FastAPI, Request, Response
+import brotli
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from .configs import Config
+from .database.executor import track_queue_wait
+from .database.instrumentation import track_statements
 
+logger = logging.getLogger(__name__)
 
-def register_middlewares(app: FastAPI, config: Config, session_local: Callable[[], Session]):
-    # noinspection PyTypeChecker
-    app.add_middleware(BaseHTTPMiddleware, dispatch=functools.partial(config_middleware, config=config))
+# Bodies of these types are compressed, images or already compressed data are sent as they are
+COMPRESSIBLE_TYPES = (
+    b"application/json",
+    b"application/x-ndjson",
+    b"application/msgpack",
+    b"application/vnd.dog-marker.",
+    b"text/",
+)
+# Binary bodies, their content-type gets no charset
+BINARY_TYPE_SUFFIXES = (b"msgpack",)
+# Payloads that rarely change, their compressed bodies are cached
+PRECOMPRESSED_PATHS = frozenset({"/v1/categories/"})
+# Levels of the responses compressed per request, see benchmarks/response_compression.py,
+# the cached ones are compressed once with the best level
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 1
+
+
+def register_middlewares(app: FastAPI, config: Config, session_local: Callable[[], Session | AsyncSession]):
     # noinspection PyTypeChecker
-    app.add_middleware(BaseHTTPMiddleware, dispatch=charset_middleware)
+    app.add_middleware(RequestStateMiddleware, config=config, session_local=session_local)
     # noinspection PyTypeChecker
-    app.add_middleware(
-        BaseHTTPMiddleware, dispatch=functools.partial(db_session_middleware, session_local=session_local)
-    )
+    app.add_middleware(CompressionMiddleware, minimum_size=config.COMPRESSION_MINIMUM_SIZE)
+
+
+class RequestStateMiddleware:
+    """Sets up the state of a request and adds the charset to the content-type of its response.
+
+    A pure ASGI middleware, so the response is passed through as it is sent instead of being
+    buffered by a task per middleware like BaseHTTPMiddleware does. The state gets the config,
+    the statement and queue wait stats and the session_local, the session itself is opened by get_db.
+    """
+
+    def __init__(self, app: ASGIApp, config: Config, session_local: Callable[[], Session | AsyncSession]):
+        self.app = app
+        self.config = config
+        self.session_local = session_local
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        state = scope.setdefault("state", {})
+        state["config"] = self.config
+        state["session_local"] = self.session_local
+
+        with track_statements() as stats, track_queue_wait() as queue_wait:
+            state["db_stats"] = stats
+            state["queue_wait"] = queue_wait
+            await self.app(scope, receive, self.send_with_charset(send))
+
+        if stats.count or queue_wait.count:
+            logger.debug(
+                "%s %s: %r, %r: %s",
+                scope["method"],
+                scope["path"],
+                stats,
+                queue_wait,
+                stats.slowest_statement,
+                extra={"db_stats": stats, "queue_wait": queue_wait},
+            )
+
+    @staticmethod
+    def send_with_charset(send: Send) -> Send:
+        async def __internal(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    (
+                        (name, value + b"; charset=utf-8")
+                        if name.lower() == b"content-type"
+                        and b"charset" not in value
+                        and not value.endswith(BINARY_TYPE_SUFFIXES)
+                        else (name, value)
+                    )
+                    for name, value in message.get("headers", [])
+                ]
+            await send(message)
+
+        return __internal
+
+
+def negotiate_encoding(accept_encoding: str | None) -> str | None:
+    """br or gzip, the one with the highest quality in the Accept-Encoding, br on a tie, None for neither."""
+    qualities: dict[str, float] = {}
+    for part in (accept_encoding or "").split(","):
+        coding, *params = (value.strip() for value in part.split(";"))
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+
+    default = qualities.get("*", 0.0)
+    encoding = max(("br", "gzip"), key=lambda encoding: qualities.get(encoding, default))
+    return encoding if qualities.get(encoding, default) > 0 else None
+
+
+def compressor(encoding: str, best: bool = False) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """The compress and the finish function of a new stream of the encoding."""
+    if encoding == "br":
+        brotli_compressor = brotli.Compressor(quality=11 if best else BROTLI_QUALITY)
+        return brotli_compressor.process, brotli_compressor.finish
+    gzip_compressor = zlib.compressobj(9 if best else GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return gzip_compressor.compress, gzip_compressor.flush
+
+
+class CompressionMiddleware:
+    """Compresses responses with brotli or gzip, negotiated with the Accept-Encoding of the request.
+
+    Bodies smaller than minimum_size are sent as they are, the headers of the compressed body
+    would take most of what it saves. Streamed bodies are compressed chunk by chunk. Responses
+    with a content-encoding of their own are not touched. The compressed bodies of the
+    precompressed_paths are cached by their content, so they are compressed once with the best level.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        precompressed_paths: frozenset[str] = PRECOMPRESSED_PATHS,
+        cache_size: int = 32,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.precompressed_paths = precompressed_paths
+        self.cache_size = cache_size
+        self.cache: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        cached = scope["path"] in self.precompressed_paths
+        await self.app(scope, receive, CompressedSend(self, send, encoding, cached))
+
+    def compress(self, encoding: str, body: bytes, cached: bool) -> bytes:
+        if not cached:
+            compress, finish = compressor(encoding)
+            return compress(body) + finish()
+
+        key = (encoding, body)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compress, finish = compressor(encoding, best=True)
+            compressed = self.cache[key] = compress(body) + finish()
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+        return compressed
+
 
+class CompressedSend:
+    """send of one response for the CompressionMiddleware, holds the start until the first body."""
 
-async def config_middleware(request: Request, call_next, config: Config | None = None):
-    request.state.config = config
-    response = await call_next(request)
-    return response
+    def __init__(self, middleware: CompressionMiddleware, send: Send, encoding: str, cached: bool):
+        self.middleware = middleware
+        self.send = send
+        self.encoding = encoding
+        self.cached = cached
+        self.start: Message | None = None
+        self.compressible = False
+        self.stream: tuple[Callable[[bytes], bytes], Callable[[], bytes]] | None = None
 
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "").encode("latin-1")
+            self.compressible = "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+            if self.compressible:
+                self.start = message
+            else:
+                await self.send(message)
+            return
 
-async def charset_middleware(request: Request, call_next):
-    response: Response = await call_next(request)
-    content_type: str = response.headers.get("content-type")
+        if message["type"] != "http.response.body" or not self.compressible:
+            await self.send(message)
+            return
 
-    if content_type and content_type.find("charset") == -1:
-        content_type = f"{content_type}; charset={response.charset}"
-        response.headers["content-type"] = content_type
+        body: bytes = message.get("body", b"")
+        more_body: bool = message.get("more_body", False)
 
-    return response
+        if self.start is not None:
+            start, self.start = self.start, None
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.compressible = False
+                await self.send(start)
+                await self.send(message)
+                return
 
+            headers = MutableHeaders(raw=start["headers"])
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if more_body:
+                self.stream = compressor(self.encoding)
+                del headers["content-length"]
+            else:
+                body = self.middleware.compress(self.encoding, body, self.cached)
+                headers["content-length"] = str(len(body))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+            await self.send(start)
 
-async def db_session_middleware(request: Request, call_next, session_local: Callable[[], Session]):
-    response = Response("Internal server error", status_code=500)
-    try:
-        request.state.db = session_local()
-        response = await call_next(request)
-    finally:
-        request.state.db.close()
-    return response
+        assert self.stream is not None
+        compress, finish = self.stream
+        body = compress(body)
+        if not more_body:
+            body += finish()
+        await self.send({"type": "http.response.body", "body": body, "more_body": more_body})
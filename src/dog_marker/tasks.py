@@ -15,6 +15,7 @@ from sqlalchemy.orm import Session
 
 from .configs import Config
 from .database.cruds import EntryCRUD, EntryImageCRUD
+from .database.spatial_index import get_spatial_index
 
 
 def register_background_tasks(
@@ -50,6 +51,22 @@ def register_background_tasks(
         max_instances=1,
     )
 
+    scheduler.add_job(
+        functools.partial(job_check_owner_deleted, local_session=local_session),
+        trigger="interval",
+        seconds=config.JOB_CLEANUP_INTERVAL_SECONDS,
+        max_instances=1,
+    )
+
+    if config.SPATIAL_INDEX:
+        # Entries changed by other workers only reach this process' index through a reload
+        scheduler.add_job(
+            functools.partial(job_reload_spatial_index, local_session=local_session),
+            trigger="interval",
+            seconds=config.JOB_CLEANUP_INTERVAL_SECONDS,
+            max_instances=1,
+        )
+
     return task_queue
 
 
@@ -59,6 +76,30 @@ def job_execute_tasks(queue: Queue[Callable[[], None]]):
         fn()
 
 
+def job_reload_spatial_index(local_session: Callable[[], Session]) -> None:
+    with local_session() as session:
+        spatial_index = get_spatial_index(session)
+        if spatial_index is not None:
+            spatial_index.load(session)
+
+
+def job_check_owner_deleted(local_session: Callable[[], Session]) -> None:
+    """Repairs entries whose owner_deleted_at disagrees with the hidden entry of their owner."""
+    with local_session() as session:
+        entry_crud = EntryCRUD(session)
+        flow = entry_crud.find_owner_deleted_mismatches()
+        if flow.is_err():
+            return  # Todo: LogError
+
+        for entry_id in flow.unwrap():
+            (
+                entry_crud.get(entry_id)
+                .map(entry_crud.sync_owner_deleted())
+                .map(entry_crud.commit())
+                .map(entry_crud.sync_spatial_index())
+            )
+
+
 def job_find_old_entries(
     config: Config, local_session: Callable[[], Session], queue: Queue[Callable[[], None]]
 ) -> None:
@@ -133,7 +174,12 @@ def task_delete_entry(entry_id: UUID, local_session: Callable[[], Session], queu
     with local_session() as session:
         entry_crud = EntryCRUD(session)
 
-        flow = entry_crud.get(entry_id).map(entry_crud.set_mark_to_delete()).map(entry_crud.commit())
+        flow = (
+            entry_crud.get(entry_id)
+            .map(entry_crud.set_mark_to_delete())
+            .map(entry_crud.commit())
+            .map(entry_crud.sync_spatial_index())
+        )
 
         if flow.is_err():
             return  # Todo: LogError
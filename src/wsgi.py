@@ -3,6 +3,7 @@ import os
 from starlette.middleware.cors import CORSMiddleware
 
 from dog_marker import create_app
+from dog_marker.api.v1.endpoints.dependecies import NEXT_CURSOR_HEADER
 from dog_marker.configs import Config, DevelopConfig
 
 env_config = os.environ.get("CONFIG", "Production")
@@ -21,4 +22,5 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
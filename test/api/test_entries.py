@@ -0,0 +1,283 @@
+import json
+import logging
+import uuid
+
+import msgpack
+import pytest
+from fastapi.testclient import TestClient
+from starlette.middleware import Middleware
+from sqlalchemy import create_engine, insert
+
+from dog_marker import create_app
+from dog_marker.api.v1.endpoints.dependecies.entry_list_format import negotiate_media_type, ENTRY_LIST_MEDIA_TYPES
+from dog_marker.configs import TestConfig
+from dog_marker.database.instrumentation import track_statements
+from dog_marker.database.models import CategoryDbModel
+from dog_marker.middlewares import RequestStateMiddleware, CompressionMiddleware, negotiate_encoding
+
+CATEGORY_KEYS = ["poison", "glass", "ticks"]
+
+
+@pytest.fixture(params=[False, True], ids=["sync_db", "async_db"])
+def client(tmp_path, request: pytest.FixtureRequest) -> TestClient:
+    config = TestConfig()
+    config.DATABASE_URL = f"sqlite:///{tmp_path / 'dog_marker.db'}"
+    config.CREATE_DB = True
+    config.ASYNC_DB = request.param
+    app = create_app(config)
+
+    engine = create_engine(config.DATABASE_URL)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(CategoryDbModel), [{"key": key, "title": key.title(), "description": None} for key in CATEGORY_KEYS]
+        )
+    engine.dispose()
+
+    return TestClient(app)
+
+
+def request_state_middleware(client: TestClient) -> Middleware:
+    (middleware,) = [m for m in client.app.user_middleware if m.cls is RequestStateMiddleware]
+    return middleware
+
+
+def create_entries(client: TestClient, user_id: uuid.UUID, count: int):
+    for i in range(count):
+        entry = {
+            "title": f"Entry {i}",
+            "longitude": 16 + i / 100,
+            "latitude": 48,
+            "categories": CATEGORY_KEYS[: i % 4],
+            "image_path": f"https://vgy.me/{i}.png",
+            "image_delete_url": f"https://vgy.me/delete/{i}",
+        }
+        response = client.post(f"/v1/user/{user_id}/entries", json=entry)
+        assert response.status_code == 200, response.text
+        if i % 3 == 0:
+            response = client.delete(f"/v1/user/{user_id}/entries/{response.json()['id']}")
+            assert response.status_code == 204
+
+
+# One statement for the page and one IN query for the categories, whatever the size of the page
+STATEMENT_BUDGETS = {
+    "/v1/entries/": 2,
+    "/v1/entries/?longitude=16&latitude=48": 2,
+    "/v1/user/{user_id}/entries": 2,
+    "/v1/user/{user_id}/entries/trash": 2,
+}
+
+
+@pytest.mark.parametrize("url", STATEMENT_BUDGETS)
+def test_list_statement_count(client: TestClient, url: str):
+    user_id = uuid.uuid4()
+
+    statement_counts = []
+    for entries in (3, 100):
+        create_entries(client, user_id, entries)
+        with track_statements() as stats:
+            response = client.get(url.format(user_id=user_id), params={"limit": 100})
+        assert response.status_code == 200
+        assert response.json()
+        statement_counts.append(stats.count)
+
+    assert statement_counts == [STATEMENT_BUDGETS[url]] * 2
+
+
+def test_request_statement_log(client: TestClient, caplog: pytest.LogCaptureFixture):
+    create_entries(client, uuid.uuid4(), 3)
+
+    with caplog.at_level(logging.DEBUG, logger="dog_marker.middlewares"):
+        client.get("/v1/entries/")
+
+    (record,) = [record for record in caplog.records if "GET /v1/entries/" in record.getMessage()]
+    assert record.db_stats.count == 2
+    assert record.db_stats.slowest_statement.startswith("SELECT")
+    assert 0 < record.db_stats.slowest_ms <= record.db_stats.total_ms
+    # Sync sessions run the service on the SessionExecutor, async sessions on the event loop
+    middleware = request_state_middleware(client)
+    assert record.queue_wait.count == (0 if middleware.kwargs["config"].ASYNC_DB else 1)
+
+
+def test_content_type_charset(client: TestClient):
+    assert client.get("/v1/entries/").headers["content-type"] == "application/json; charset=utf-8"
+    assert client.get("/docs").headers["content-type"] == "text/html; charset=utf-8"
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("gzip, deflate, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br; q=0.4, gzip; q=0.5", "gzip"),
+        ("gzip; q=0.5", "gzip"),
+        ("*", "br"),
+        ("*, br;q=0", "gzip"),
+        ("identity", None),
+        ("br;q=0", None),
+        ("br ; q=0, gzip;q=0", None),
+    ],
+)
+def test_negotiate_encoding(accept_encoding: str, encoding: str | None):
+    assert negotiate_encoding(accept_encoding) == encoding
+
+
+def test_compression(client: TestClient):
+    create_entries(client, uuid.uuid4(), 12)
+
+    for accept_encoding in ("br", "gzip"):
+        response = client.get("/v1/entries/", headers={"Accept-Encoding": accept_encoding})
+        assert response.headers["content-encoding"] == accept_encoding
+        assert response.headers["vary"] == "Accept, Accept-Encoding"
+        assert int(response.headers["content-length"]) < len(response.content)
+        assert response.json() == client.get("/v1/entries/", headers={"Accept-Encoding": "identity"}).json()
+
+    # Too small to be worth it
+    response = client.get("/v1/categories/", headers={"Accept-Encoding": "br"})
+    assert "content-encoding" not in response.headers
+
+
+def test_precompressed_categories(client: TestClient):
+    (compression,) = [m for m in client.app.user_middleware if m.cls is CompressionMiddleware]
+    compression.kwargs["minimum_size"] = 0
+
+    responses = [client.get("/v1/categories/", headers={"Accept-Encoding": "br"}) for _ in range(2)]
+
+    assert [response.headers["content-encoding"] for response in responses] == ["br", "br"]
+    assert responses[0].json() == responses[1].json() == client.get("/v1/categories/").json()
+    layer = client.app.middleware_stack
+    while not isinstance(layer, CompressionMiddleware):
+        layer = layer.app
+    assert len(layer.cache) == 1
+
+
+@pytest.mark.parametrize(
+    "accept, media_type",
+    [
+        (None, "application/json"),
+        ("*/*", "application/json"),
+        ("text/html, application/msgpack;q=0.9, */*;q=0.8", "application/msgpack"),
+        (
+            "application/vnd.dog-marker.columns+json;q=0.5, application/vnd.dog-marker.columns+msgpack",
+            "application/vnd.dog-marker.columns+msgpack",
+        ),
+        ("image/png", "application/json"),
+    ],
+)
+def test_negotiate_media_type(accept: str | None, media_type: str):
+    assert negotiate_media_type(accept, ENTRY_LIST_MEDIA_TYPES) == media_type
+
+
+@pytest.mark.parametrize("url", ["/v1/entries/", "/v1/user/{user_id}/entries"])
+def test_entry_list_formats(client: TestClient, url: str):
+    user_id = uuid.uuid4()
+    create_entries(client, user_id, 12)
+    url = url.format(user_id=user_id)
+    params = {"limit": 5}
+    listed = client.get(url, params=params).json()
+
+    response = client.get(url, params=params, headers={"Accept": "application/msgpack"})
+    assert response.headers["content-type"] == "application/msgpack"
+    assert "Accept" in response.headers["vary"].split(", ")
+    assert "x-next-cursor" in response.headers
+    assert msgpack.unpackb(response.content) == listed
+
+    for media_type, decode in [
+        ("application/vnd.dog-marker.columns+json", json.loads),
+        ("application/vnd.dog-marker.columns+msgpack", msgpack.unpackb),
+    ]:
+        response = client.get(url, params=params, headers={"Accept": media_type})
+        assert "Accept" in response.headers["vary"].split(", ")
+        columns = decode(response.content)
+        assert columns["id"] == [entry["id"] for entry in listed]
+        assert columns["longitude"] == [entry["longitude"] for entry in listed]
+        assert columns["latitude"] == [entry["latitude"] for entry in listed]
+        assert columns["warning_level"] == [entry["warning_level"] for entry in listed]
+        assert [[columns["category_infos"][i] for i in indices] for indices in columns["categories"]] == [
+            entry["category_infos"] for entry in listed
+        ]
+        assert len({category["key"] for category in columns["category_infos"]}) == len(columns["category_infos"])
+
+
+@pytest.mark.parametrize(
+    "url", ["/v1/entries/", "/v1/user/{user_id}/entries", "/v1/user/{user_id}/entries/trash", "/v1/entries/{entry_id}"]
+)
+def test_sparse_fieldsets(client: TestClient, url: str):
+    user_id = uuid.uuid4()
+    create_entries(client, user_id, 12)
+    entry_id = client.get("/v1/entries/").json()[0]["id"]
+    url = url.format(user_id=user_id, entry_id=entry_id)
+    fields = ["id", "latitude", "longitude", "warning_level"]
+    expected = client.get(url, params={"user_id": str(user_id)}).json()
+
+    with track_statements() as stats:
+        response = client.get(url, params={"user_id": str(user_id), "fields": ",".join(fields)})
+
+    assert response.status_code == 200, response.text
+    if isinstance(expected, list):
+        assert response.json() == [{field: entry[field] for field in fields} for entry in expected]
+    else:
+        assert response.json() == {field: expected[field] for field in fields}
+    # Neither the categories query nor the image subqueries
+    assert stats.count == 1
+    assert "entry_images" not in stats.slowest_statement
+
+    assert client.get(url, params={"fields": "id,secret"}).status_code == 418
+
+
+def test_session_only_for_routes_using_it(client: TestClient):
+    middleware = request_state_middleware(client)
+    session_local = middleware.kwargs["session_local"]
+    sessions = []
+    middleware.kwargs["session_local"] = lambda: sessions.append(session_local()) or sessions[-1]
+    middleware.kwargs["config"].APP_TOKEN = "secret"
+
+    assert client.get("/docs").status_code == 200
+    assert client.get("/v1/openapi.json").status_code == 200
+    assert client.get("/v1/missing").status_code == 404
+    assert client.get(f"/v1/user/{uuid.uuid4()}/entries").status_code == 401
+    assert not sessions
+
+    assert client.get("/v1/categories/").status_code == 200
+    assert len(sessions) == 1
+
+
+def test_list_matches_get_entry(client: TestClient):
+    user_id = uuid.uuid4()
+    create_entries(client, user_id, 12)
+
+    for url in ("/v1/entries/", f"/v1/user/{user_id}/entries", f"/v1/user/{user_id}/entries/trash"):
+        entries = client.get(url, params={"user_id": str(user_id)}).json()
+        assert entries
+        for entry in entries:
+            expected = client.get(f"/v1/entries/{entry['id']}", params={"user_id": str(user_id)}).json()
+            # The single entry is loaded through the ORM, the list through the column projection
+            assert entry == expected
+
+
+def test_filter_by_categories(client: TestClient):
+    user_id = uuid.uuid4()
+    create_entries(client, user_id, 12)
+
+    entries = client.get("/v1/entries/", params={"categories": ["glass", "ticks"]}).json()
+
+    # Entry i has the first i % 4 categories, every third one is in the trash of its owner
+    expected = [f"Entry {i}" for i in range(12) if i % 4 >= 2 and i % 3 != 0]
+    assert sorted(entry["title"] for entry in entries) == sorted(expected)
+    assert all("glass" in entry["categories"] for entry in entries)
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+def test_export_matches_list(client: TestClient, monkeypatch: pytest.MonkeyPatch, accept_encoding: str):
+    monkeypatch.setattr("dog_marker.api.v1.services.entry_service.EXPORT_BATCH_SIZE", 5)
+    user_id = uuid.uuid4()
+    create_entries(client, user_id, 12)
+    params = {"user_id": str(user_id), "categories": ["poison"]}
+
+    response = client.get("/v1/entries/export", params=params, headers={"Accept-Encoding": accept_encoding})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson; charset=utf-8"
+    assert response.headers.get("content-encoding", "identity") == accept_encoding
+    exported = [json.loads(line) for line in response.text.splitlines()]
+    listed = client.get("/v1/entries/", params=params).json()
+    assert exported == sorted(listed, key=lambda entry: entry["id"])
@@ -2,15 +2,17 @@ import uuid
 from datetime import datetime
 
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
 from dog_marker.database.base import Base
+from dog_marker.database.functions import register_sqlite_functions
 
 
 @pytest.fixture()
 def db() -> Session:
     engine = create_engine("sqlite:///:memory:")
+    event.listen(engine, "connect", register_sqlite_functions)
     Base.metadata.create_all(engine)
     session_local = sessionmaker(autocommit=False, autoflush=False, bind=engine)
     session = session_local()
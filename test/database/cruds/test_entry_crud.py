@@ -1,7 +1,16 @@
+import datetime
 import random
 import uuid
 
+import pytest
+from sqlalchemy import event
+
 from dog_marker.database.cruds import EntryCRUD
+from dog_marker.database.errors import DbInvalidCursorError, DbNotFoundError
+from dog_marker.database.models import CategoryDbModel, HiddenEntry
+from dog_marker.database.schemas import WarningLevel
+from dog_marker.dtypes.coordinate import Coordinate, BoundingBox
+from dog_marker.dtypes.pagination import Pagination, encode_cursor
 
 
 def test_create_entry(entry_crud: EntryCRUD):
@@ -36,3 +45,295 @@ def test_create_entry(entry_crud: EntryCRUD):
     assert value.update_date
 
     return
+
+
+def test_filter_by_distance(entry_crud: EntryCRUD):
+    owner_id = uuid.uuid4()
+    coordinates = {
+        "near": (16.3738, 48.2082),
+        "close": (16.4000, 48.2200),
+        "far": (16.6000, 48.3000),
+        "other side": (-179.9, 48.2),
+    }
+
+    for title, (longitude, latitude) in coordinates.items():
+        entry_crud.create(owner_id, title).map(entry_crud.set_coordinate(longitude, latitude)).map(entry_crud.add())
+    entry_crud.db.commit()
+
+    center = Coordinate(longitude=16.3738, latitude=48.2082)
+    flow = (
+        entry_crud.query()
+        .map(entry_crud.filter_by_distance(center, 5))
+        .map(entry_crud.order_by_coordinate(center))
+        .map(entry_crud.all())
+    )
+
+    assert [entry.title for entry in flow.ok()] == ["near", "close"]
+
+
+def test_filter_by_distance_across_antimeridian(entry_crud: EntryCRUD):
+    owner_id = uuid.uuid4()
+    entry_crud.create(owner_id, "east").map(entry_crud.set_coordinate(179.99, 0)).map(entry_crud.add())
+    entry_crud.create(owner_id, "west").map(entry_crud.set_coordinate(-179.99, 0)).map(entry_crud.add())
+    entry_crud.db.commit()
+
+    center = Coordinate(longitude=180, latitude=0)
+    flow = entry_crud.query().map(entry_crud.filter_by_distance(center, 5)).map(entry_crud.all())
+
+    assert sorted(entry.title for entry in flow.ok()) == ["east", "west"]
+
+
+def test_clusters(entry_crud: EntryCRUD):
+    owner_id = uuid.uuid4()
+    entries = [
+        ("vienna", 16.37, 48.20, "warning"),
+        ("vienna", 16.38, 48.21, "danger"),
+        ("paris", 2.35, 48.85, "information"),
+        ("new york", -74.0, 40.7, "danger"),
+    ]
+    for title, longitude, latitude, warning_level in entries:
+        (
+            entry_crud.create(owner_id, title)
+            .map(entry_crud.set_coordinate(longitude, latitude))
+            .map(entry_crud.set_warning_level(warning_level))
+            .map(entry_crud.add())
+        )
+    entry_crud.db.commit()
+
+    europe = BoundingBox(min_longitude=0, min_latitude=40, max_longitude=20, max_latitude=55)
+    flow = entry_crud.query().map(entry_crud.filter_by_bounding_box(europe)).map(entry_crud.clusters(3))
+    clusters = sorted(flow.ok(), key=lambda cluster: cluster.count)
+
+    assert [cluster.count for cluster in clusters] == [1, 2]
+    assert clusters[0].warning_level == 0
+    assert clusters[1].warning_level == 2
+    assert clusters[1].longitude == pytest.approx(16.375)
+    assert clusters[1].latitude == pytest.approx(48.205)
+
+
+def walk_pages(
+    entry_crud: EntryCRUD, coordinate: Coordinate | None = None, limit: int = 7, skip: int = 0
+) -> list[list[uuid.UUID]]:
+    pages = []
+    cursor = None
+    while True:
+        page_info = Pagination(skip=skip, limit=limit, cursor=cursor)
+        page = entry_crud.query().and_then(entry_crud.paginate(page_info, coordinate)).ok()
+        pages.append([entry.id for entry in page])
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_paginate(entry_crud: EntryCRUD):
+    random.seed(3)
+    owner_id = uuid.uuid4()
+    update_date = datetime.datetime(2024, 1, 1)
+    for i in range(25):
+        entry = (
+            entry_crud.create(owner_id, f"Entry {i}")
+            .map(entry_crud.set_coordinate(random.uniform(9, 17), random.uniform(46, 49)))
+            .map(entry_crud.add())
+            .ok()
+        )
+        # Equal update dates and coordinates must be ordered by id
+        entry.create_date = entry.update_date = update_date + datetime.timedelta(days=i // 3)
+        if i % 5 == 0:
+            entry.longitude, entry.latitude = 16.0, 48.0
+    entry_crud.db.commit()
+
+    center = Coordinate(longitude=16.0, latitude=48.0)
+    for coordinate in (None, center):
+        pages = walk_pages(entry_crud, coordinate)
+        expected = [
+            entry.id
+            for entry in entry_crud.query()
+            .and_then(entry_crud.paginate(Pagination(skip=0, limit=100), coordinate))
+            .ok()
+        ]
+
+        assert [len(page) for page in pages] == [7, 7, 7, 4]
+        assert [entry_id for page in pages for entry_id in page] == expected
+
+        # A client that keeps sending its skip with the cursor only skips on the first page
+        pages = walk_pages(entry_crud, coordinate, skip=3)
+        assert [len(page) for page in pages] == [7, 7, 7, 1]
+        assert [entry_id for page in pages for entry_id in page] == expected[3:]
+
+    by_update_date = entry_crud.query().and_then(entry_crud.paginate(Pagination(skip=0, limit=100))).ok()
+    assert by_update_date[0].update_date == update_date + datetime.timedelta(days=8)
+
+    by_distance = entry_crud.query().and_then(entry_crud.paginate(Pagination(skip=0, limit=100), center)).ok()
+    assert [(entry.longitude, entry.latitude) for entry in by_distance[:5]] == [(16.0, 48.0)] * 5
+    assert [entry.id for entry in by_distance[:5]] == sorted(entry.id for entry in by_distance[:5])
+
+
+def test_paginate_invalid_cursor(entry_crud: EntryCRUD):
+    time_cursor = entry_crud.query().and_then(entry_crud.paginate(Pagination(skip=0, limit=1))).ok().next_cursor
+    assert time_cursor is None
+
+    entry_crud.create(uuid.uuid4(), "a").map(entry_crud.set_coordinate(1, 1)).map(entry_crud.add())
+    entry_crud.create(uuid.uuid4(), "b").map(entry_crud.set_coordinate(2, 2)).map(entry_crud.add())
+    entry_crud.db.commit()
+
+    time_cursor = entry_crud.query().and_then(entry_crud.paginate(Pagination(skip=0, limit=1))).ok().next_cursor
+    coordinate = Coordinate(longitude=0, latitude=0)
+    invalid_cursors = (
+        (time_cursor, coordinate),
+        ("not a cursor", None),
+        ("WzFd", None),
+        (encode_cursor("update_date", "2024-01-01T00:00:00", 5), None),
+        (encode_cursor("distance", 1.5, 5), coordinate),
+    )
+    for cursor, paginate_coordinate in invalid_cursors:
+        flow = entry_crud.query().and_then(
+            entry_crud.paginate(Pagination(skip=0, limit=1, cursor=cursor), paginate_coordinate)
+        )
+        assert isinstance(flow.err(), DbInvalidCursorError)
+
+
+def test_is_deleted_and_image_from_sql(entry_crud: EntryCRUD):
+    owner_id = uuid.uuid4()
+    entry = (
+        entry_crud.create(owner_id, "Entry")
+        .map(entry_crud.set_coordinate(16, 48))
+        .map(entry_crud.add_image("https://vgy.me/1.png", "https://vgy.me/delete/1"))
+        .map(entry_crud.add())
+        .map(entry_crud.commit())
+        .ok()
+    )
+    entry_crud.add_image("https://vgy.me/2.png", "https://vgy.me/delete/2")(entry)
+    entry_crud.delete(user_id=uuid.uuid4())(entry)
+    entry_crud.commit()(entry)
+
+    assert entry.image_path == "https://vgy.me/2.png"
+    assert entry.image_delete_url == "https://vgy.me/delete/2"
+    assert entry.is_deleted is False
+
+    entry_crud.delete(user_id=owner_id)(entry)
+    entry_crud.commit()(entry)
+
+    assert entry.is_deleted is True
+
+
+def test_project_fields(entry_crud: EntryCRUD):
+    (
+        entry_crud.create(uuid.uuid4(), "Entry")
+        .map(entry_crud.set_description("Glass"))
+        .map(entry_crud.set_coordinate(16, 48))
+        .map(entry_crud.add_image("https://vgy.me/1.png", "https://vgy.me/delete/1"))
+        .map(entry_crud.add())
+        .map(entry_crud.commit())
+    )
+
+    queries = [
+        entry_crud.query().map(entry_crud.project(frozenset(fields))).ok()
+        for fields in (("id", "title"), ("id", "longitude", "latitude"), ("id", "image_path"))
+    ]
+
+    # Only the skippable columns that are not requested change the statement
+    assert queries[0].statement is queries[1].statement
+    assert queries[0].statement is not queries[2].statement
+    rows = [query.all(entry_crud.db)[0] for query in queries]
+    assert (rows[0].title, rows[0].description, rows[0].image_path) == ("Entry", None, None)
+    assert (rows[2].description, rows[2].image_path, rows[2].image_delete_url) == (None, "https://vgy.me/1.png", None)
+
+
+def test_set_categories(entry_crud: EntryCRUD):
+    entry_crud.db.add_all([CategoryDbModel(key=key, title=key) for key in ("poison", "glass", "ticks")])
+    entry_crud.db.commit()
+    entry = (
+        entry_crud.create(uuid.uuid4(), "Entry")
+        .map(entry_crud.set_coordinate(16, 48))
+        .map(entry_crud.add())
+        .and_then(entry_crud.set_categories(["poison", "glass", "poison"]))
+        .map(entry_crud.commit())
+        .ok()
+    )
+    assert sorted(category.key for category in entry.categories) == ["glass", "poison"]
+
+    statements: list[str] = []
+    event.listen(entry_crud.db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    entry_crud.set_categories(["glass", "poison"])(entry)
+    assert not [statement for statement in statements if statement.startswith(("INSERT", "DELETE"))]
+
+    flow = entry_crud.set_categories(["glass", "ticks"])(entry).map(entry_crud.commit())
+    assert sorted(category.key for category in flow.ok().categories) == ["glass", "ticks"]
+
+    flow = entry_crud.set_categories(["glass", "unknown"])(entry)
+    assert isinstance(flow.err(), DbNotFoundError)
+    assert flow.err().msg == "Cannot find category with id unknown"
+
+
+def test_stream_categories(entry_crud: EntryCRUD):
+    entry_crud.db.add_all([CategoryDbModel(key=key, title=key) for key in ("poison", "glass")])
+    entry_crud.db.commit()
+    for i in range(6):
+        (
+            entry_crud.create(uuid.uuid4(), f"Entry {i}")
+            .map(entry_crud.set_coordinate(16, 48))
+            .map(entry_crud.set_warning_level(WarningLevel(i % 2)))
+            .map(entry_crud.add())
+            .and_then(entry_crud.set_categories([("poison", "glass")[i % 2]]))
+        )
+    entry_crud.db.commit()
+
+    statements: list[str] = []
+    event.listen(entry_crud.db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    for dense, warning_level in ((True, None), (False, WarningLevel.warning)):
+        statements.clear()
+        batches = (
+            entry_crud.query()
+            .map(entry_crud.filter_by_warning_level(warning_level))
+            .map(entry_crud.project())
+            .map(entry_crud.stream(4, dense=dense))
+            .ok()
+        )
+        rows = [row for batch in batches for row in batch]
+
+        assert len(rows) == (6 if dense else 3)
+        assert [[category.key for category in row.categories] for row in rows] == [
+            [("poison", "glass")[row.warning_level]] for row in rows
+        ]
+        # The id range of a selective query would read the categories of the filtered out entries too
+        category_statements = [statement for statement in statements if "category_key" in statement]
+        assert category_statements
+        assert all(("BETWEEN" in statement) is dense for statement in category_statements)
+
+
+def test_owner_deleted_at(entry_crud: EntryCRUD):
+    owner_id = uuid.uuid4()
+    entry = (
+        entry_crud.create(owner_id, "Entry")
+        .map(entry_crud.set_coordinate(16, 48))
+        .map(entry_crud.add())
+        .map(entry_crud.commit())
+        .ok()
+    )
+    entry_crud.delete(user_id=uuid.uuid4())(entry)
+    entry_crud.commit()(entry)
+    assert entry.owner_deleted_at is None
+
+    entry_crud.delete(user_id=owner_id)(entry)
+    entry_crud.commit()(entry)
+    hidden_entry = entry_crud.db.query(HiddenEntry).filter_by(entry_id=entry.id, user_id=owner_id).one()
+    assert entry.owner_deleted_at == hidden_entry.update_date
+    assert entry_crud.query().map(entry_crud.filter_to_delete()).map(entry_crud.all()).ok() == [entry]
+    assert entry_crud.find_owner_deleted_mismatches().ok() == []
+
+    entry_crud.undo_delete(user_id=owner_id)(entry)
+    entry_crud.commit()(entry)
+    assert entry.owner_deleted_at is None
+    assert entry_crud.query().map(entry_crud.filter_owner_deleted()).map(entry_crud.all()).ok() == [entry]
+
+    # Hidden entries written around the CRUD are found and repaired by the consistency check
+    entry_crud.db.add(HiddenEntry(entry_id=entry.id, user_id=owner_id))
+    entry_crud.db.commit()
+    assert entry_crud.find_owner_deleted_mismatches().ok() == [entry.id]
+
+    entry_crud.sync_owner_deleted()(entry)
+    entry_crud.commit()(entry)
+    assert entry.is_deleted is True
+    assert entry_crud.find_owner_deleted_mismatches().ok() == []
@@ -0,0 +1,46 @@
+import uuid
+
+from sqlalchemy import literal, select
+from sqlalchemy.orm import Session
+
+from dog_marker.database.cached_statement import STATEMENT_CACHE_SIZE, CachedStatement
+from dog_marker.database.cruds import EntryCRUD
+from dog_marker.dtypes.coordinate import Coordinate
+
+
+def test_statements_are_built_once(db: Session):
+    entry_crud = EntryCRUD(db)
+    owner_ids = [uuid.uuid4(), uuid.uuid4()]
+    for i, owner_id in enumerate(owner_ids):
+        entry_crud.create(owner_id, f"Entry {i}").map(entry_crud.set_coordinate(16 + i, 48)).map(entry_crud.add())
+    db.commit()
+
+    queries = [entry_crud.query().map(entry_crud.filter_by_user(owner_id)).ok() for owner_id in owner_ids]
+
+    assert queries[0].statement is queries[1].statement
+    assert [[entry.user_id for entry in entry_crud.all()(query)] for query in queries] == [
+        [owner_ids[0]],
+        [owner_ids[1]],
+    ]
+
+
+def test_statement_key_covers_structure(db: Session):
+    entry_crud = EntryCRUD(db)
+    near = Coordinate(longitude=16.37, latitude=48.2)
+    antimeridian = Coordinate(longitude=179.99, latitude=0)
+
+    queries = [
+        entry_crud.query().map(entry_crud.filter_by_distance(coordinate, 5)).ok() for coordinate in (near, antimeridian)
+    ]
+
+    # The bounding box around the antimeridian ORs its longitude conditions
+    assert queries[0].key != queries[1].key
+    assert queries[0].statement is not queries[1].statement
+
+
+def test_statement_cache_is_bounded():
+    for i in range(3 * STATEMENT_CACHE_SIZE):
+        CachedStatement.root(("test", i), lambda: select(literal(i)))
+
+    assert len(CachedStatement._cache) <= STATEMENT_CACHE_SIZE * 1.5
+    CachedStatement.clear()
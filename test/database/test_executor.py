@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+from dog_marker.database.executor import SessionExecutor, track_queue_wait
+from dog_marker.database.instrumentation import current_statement_stats, track_statements
+
+
+def test_calls_wait_for_a_free_thread():
+    executor = SessionExecutor(max_workers=2)
+    release = threading.Event()
+    running = []
+
+    def call(i: int) -> int:
+        running.append(i)
+        release.wait()
+        return i
+
+    async def run():
+        with track_queue_wait() as queue_wait:
+            tasks = [asyncio.create_task(executor.run(lambda i=i: call(i))) for i in range(5)]
+            while len(running) < 2:
+                await asyncio.sleep(0.01)
+            assert (executor.running, executor.queued) == (2, 3)
+            release.set()
+            results = await asyncio.gather(*tasks)
+        return results, queue_wait
+
+    results, queue_wait = asyncio.run(run())
+
+    assert results == list(range(5))
+    assert (executor.running, executor.queued) == (0, 0)
+    assert executor.stats.count == queue_wait.count == 5
+    assert queue_wait.longest_ms > 0
+
+
+def test_calls_run_in_the_context_of_the_caller():
+    executor = SessionExecutor(max_workers=1)
+
+    async def run():
+        with track_statements() as stats:
+            return stats, await executor.run(current_statement_stats)
+
+    stats, call_stats = asyncio.run(run())
+    assert call_stats is stats
@@ -0,0 +1,33 @@
+import pytest
+from sqlalchemy import select, literal, func
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session
+
+from dog_marker.database.functions import haversine, haversine_expression, haversine_km
+from dog_marker.database.models import EntryDbModel
+
+
+def test_haversine_km():
+    vienna, paris = (48.2082, 16.3738), (48.8566, 2.3522)
+    assert haversine_km(*vienna, *paris) == pytest.approx(1034.7, abs=1)
+    assert haversine_km(*vienna, *vienna) == 0
+    assert haversine_km(None, 0, 0, 0) is None
+
+
+def test_haversine_on_sqlite(db: Session):
+    args = [literal(48.2082), literal(16.3738), literal(48.8566), literal(2.3522)]
+    registered, compiled, expression = db.execute(
+        select(func.haversine(*args), haversine(*args), haversine_expression(*args))
+    ).one()
+
+    assert registered == haversine_km(48.2082, 16.3738, 48.8566, 2.3522)
+    assert compiled == pytest.approx(registered)
+    assert expression == pytest.approx(registered)
+
+
+def test_haversine_on_postgres():
+    statement = select(EntryDbModel.id).order_by(EntryDbModel.calc_distance(16.3738, 48.2082))
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "haversine(" not in sql
+    assert "atan2" in sql
@@ -0,0 +1,65 @@
+import datetime
+import re
+import uuid
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from dog_marker.api.v1.schemas import CreateEntrySchema
+from dog_marker.api.v1.services import EntryService
+from dog_marker.dtypes.coordinate import Coordinate
+from dog_marker.dtypes.pagination import Pagination
+
+USER_ID = uuid.uuid4()
+PAGE_INFO = Pagination(skip=0, limit=5)
+
+LISTINGS = {
+    "get_all": lambda service: service.get_all(page_info=PAGE_INFO),
+    "get_all_filtered": lambda service: service.get_all(
+        page_info=PAGE_INFO, user_id=USER_ID, date_from=datetime.datetime(2024, 1, 1), warning_level="warning"
+    ),
+    "get_all_nearby": lambda service: service.get_all(
+        page_info=PAGE_INFO, coordinate=Coordinate(longitude=16, latitude=48), max_distance_km=5
+    ),
+    "get_all_by_categories": lambda service: service.get_all(page_info=PAGE_INFO, categories=["poison"]),
+    "get_all_by_owner": lambda service: service.get_all_by_owner(page_info=PAGE_INFO, owner_id=USER_ID),
+    "deleted_entries": lambda service: service.deleted_entries(page_info=PAGE_INFO, user_id=USER_ID),
+}
+
+FULL_SCAN = re.compile(r"^SCAN (entries|hidden_entries|entry_images|entries_categories_associations)$")
+
+
+@pytest.fixture
+def service(db: Session) -> EntryService:
+    service = EntryService(db)
+    for i in range(20):
+        new_entry = CreateEntrySchema(
+            title=f"Entry {i}", longitude=16, latitude=48, image_path="https://vgy.me/entry.png"
+        )
+        entry = service.create(USER_ID, new_entry)
+        if i % 4 == 0:
+            service.delete(entry.id, USER_ID)
+    return service
+
+
+@pytest.mark.parametrize("listing", LISTINGS)
+def test_listing_uses_indexes(service: EntryService, listing: str):
+    engine = service.db.get_bind()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        LISTINGS[listing](service)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+    statement, parameters = statements[0]
+    with engine.connect() as connection:
+        plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+    assert any(re.match(r"^(SCAN|SEARCH) entries USING", detail) for detail in plan), plan
+    assert not [detail for detail in plan if FULL_SCAN.match(detail)], plan
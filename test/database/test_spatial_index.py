@@ -0,0 +1,163 @@
+import random
+import uuid
+
+import pytest
+from sqlalchemy.orm import Session
+
+from dog_marker.api.v1.schemas import CreateEntrySchema
+from dog_marker.api.v1.services import EntryService
+from dog_marker.database.cruds import EntryCRUD
+from dog_marker.database.spatial_index import SpatialIndex
+from dog_marker.dtypes.coordinate import Coordinate
+from dog_marker.dtypes.pagination import Pagination
+
+
+@pytest.fixture
+def entries(db: Session) -> list[uuid.UUID]:
+    random.seed(11)
+    entry_crud = EntryCRUD(db)
+    owner_ids = [uuid.uuid4() for _ in range(5)]
+
+    entry_ids = []
+    for i in range(500):
+        owner_id = random.choice(owner_ids)
+        entry = (
+            entry_crud.create(owner_id, f"Entry {i}")
+            .map(entry_crud.set_coordinate(random.uniform(9, 17), random.uniform(46, 49)))
+            .map(entry_crud.set_warning_level(random.choice(["information", "warning", "danger"])))
+            .map(entry_crud.add())
+            .map(entry_crud.commit())
+            .ok()
+        )
+        if i % 10 == 0:
+            entry_crud.delete(user_id=owner_id)(entry)
+        elif i % 10 == 1:
+            entry_crud.delete(user_id=owner_id, permanent=True)(entry)
+        elif i % 10 == 2:
+            entry_crud.delete(user_id=random.choice(owner_ids))(entry)
+        entry_ids.append(entry.id)
+
+    db.commit()
+    return entry_ids
+
+
+def sql_nearest(db: Session, coordinate: Coordinate, limit: int, warning_level: str) -> list[uuid.UUID]:
+    entry_crud = EntryCRUD(db)
+    flow = (
+        entry_crud.query()
+        .map(entry_crud.filter_marked_to_delete())
+        .map(entry_crud.filter_owner_deleted())
+        .map(entry_crud.filter_by_warning_level(warning_level))
+        .map(entry_crud.order_by_coordinate(coordinate))
+        .map(entry_crud.all(Pagination(skip=0, limit=limit)))
+    )
+    return [entry.id for entry in flow.ok()]
+
+
+def test_nearest_matches_sql(db: Session, entries: list[uuid.UUID]):
+    spatial_index = SpatialIndex(rebuild_threshold=16)
+    spatial_index.load(db)
+
+    for _ in range(20):
+        coordinate = Coordinate(longitude=random.uniform(9, 17), latitude=random.uniform(46, 49))
+        for warning_level, level in (("information", 0), ("danger", 2)):
+            expected = sql_nearest(db, coordinate, 50, warning_level)
+            assert spatial_index.nearest(coordinate, 50, min_warning_level=level) == expected
+
+
+def test_get_all_with_spatial_index_matches_sql(db: Session, entries: list[uuid.UUID]):
+    spatial_index = SpatialIndex(rebuild_threshold=16)
+    spatial_index.load(db)
+
+    service = EntryService(db)
+    user_id = uuid.uuid4()
+    for i in range(40):
+        new_entry = CreateEntrySchema(
+            title=f"New {i}", longitude=random.uniform(9, 17), latitude=random.uniform(46, 49), warning_level="danger"
+        )
+        db.info["spatial_index"] = spatial_index
+        created = service.create(user_id, new_entry)
+        if i % 3 == 0:
+            service.delete(created.id, user_id)
+        if i % 6 == 0:
+            service.undo_deleted_entry(created.id, user_id)
+
+    page_info = Pagination(skip=20, limit=30)
+    for _ in range(10):
+        coordinate = Coordinate(longitude=random.uniform(9, 17), latitude=random.uniform(46, 49))
+        query = dict(page_info=page_info, user_id=user_id, coordinate=coordinate, warning_level="warning")
+
+        db.info["spatial_index"] = spatial_index
+        with_index = [entry["id"] for entry in service.get_all(**query)]
+        db.info.pop("spatial_index")
+        without_index = [entry["id"] for entry in service.get_all(**query)]
+
+        assert with_index == without_index
+
+
+def test_cursor_pages_with_spatial_index_match_sql(db: Session, entries: list[uuid.UUID]):
+    spatial_index = SpatialIndex(rebuild_threshold=16)
+    spatial_index.load(db)
+    service = EntryService(db)
+
+    coordinate = Coordinate(longitude=13, latitude=47.5)
+    for use_index in (True, False):
+        if use_index:
+            db.info["spatial_index"] = spatial_index
+        else:
+            db.info.pop("spatial_index")
+
+        entry_ids = []
+        cursor = None
+        while True:
+            page_info = Pagination(skip=0, limit=40, cursor=cursor)
+            page = service.get_all(page_info=page_info, coordinate=coordinate)
+            entry_ids.extend(entry["id"] for entry in page)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+        full_page = service.get_all(page_info=Pagination(skip=0, limit=100), coordinate=coordinate)
+        assert len(entry_ids) == len(set(entry_ids)) == len(spatial_index)
+        assert entry_ids[:100] == [entry["id"] for entry in full_page]
+
+
+def test_syncs_during_load_survive_the_build(db: Session, entries: list[uuid.UUID], monkeypatch: pytest.MonkeyPatch):
+    spatial_index = SpatialIndex()
+    added_id, removed_id = uuid.uuid4(), entries[3]
+    execute = db.execute
+
+    def execute_and_sync(*args, **kwargs):
+        # Another request syncs its entries after the load read its snapshot
+        result = execute(*args, **kwargs)
+        spatial_index.upsert(added_id, 16, 48)
+        spatial_index.remove(removed_id)
+        return result
+
+    monkeypatch.setattr(db, "execute", execute_and_sync)
+    spatial_index.load(db)
+
+    assert added_id in spatial_index
+    assert removed_id not in spatial_index
+    assert spatial_index.nearest(Coordinate(longitude=16, latitude=48), 1) == [added_id]
+
+
+def test_index_missing_writes_of_other_workers_is_not_used(db: Session, entries: list[uuid.UUID]):
+    worker_indexes = [SpatialIndex(), SpatialIndex()]
+    for spatial_index in worker_indexes:
+        spatial_index.load(db)
+    assert all(spatial_index.is_current(db) for spatial_index in worker_indexes)
+
+    service = EntryService(db)
+    coordinate = Coordinate(longitude=20, latitude=40)
+    db.info["spatial_index"] = worker_indexes[0]
+    created = service.create(uuid.uuid4(), CreateEntrySchema(title="New", longitude=20, latitude=40))
+
+    assert worker_indexes[0].is_current(db)
+    assert not worker_indexes[1].is_current(db)
+    for spatial_index in worker_indexes:
+        db.info["spatial_index"] = spatial_index
+        assert service.get_all(page_info=Pagination(skip=0, limit=5), coordinate=coordinate)[0]["id"] == created.id
+
+    worker_indexes[1].load(db)
+    assert worker_indexes[1].is_current(db)
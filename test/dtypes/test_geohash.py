@@ -0,0 +1,43 @@
+import math
+import random
+
+from dog_marker.dtypes import geohash
+from dog_marker.dtypes.coordinate import Coordinate, EARTH_RADIUS_KM
+
+
+def test_encode():
+    assert geohash.encode(-5.6, 42.6, 5) == "ezs42"
+    assert geohash.encode(10.40744, 57.64911, 11) == "u4pruydqqvj"
+
+
+def test_prefix_range():
+    assert geohash.prefix_range("u33d") == ("u33d", "u33e")
+    assert geohash.prefix_range("u339") == ("u339", "u33b")
+    assert geohash.prefix_range("u3zz") == ("u3zz", "u4")
+    assert geohash.prefix_range("zz") == ("zz", None)
+
+
+def test_cover_contains_all_points_within_distance():
+    random.seed(7)
+    for _ in range(200):
+        center = Coordinate(longitude=random.uniform(-180, 180), latitude=random.uniform(-80, 80))
+        distance_km = random.choice([0.1, 1, 10, 100])
+        cells = geohash.cover(center, distance_km)
+        assert cells is not None
+
+        bearing = random.uniform(0, 360)
+        fraction = random.random()
+        point = _destination(center, bearing, distance_km * fraction)
+
+        assert any(geohash.encode(point.longitude, point.latitude).startswith(cell) for cell in cells)
+
+
+def _destination(start: Coordinate, bearing: float, distance_km: float) -> Coordinate:
+    angular = distance_km / EARTH_RADIUS_KM
+    lat1, lon1, theta = math.radians(start.latitude), math.radians(start.longitude), math.radians(bearing)
+    lat2 = math.asin(math.sin(lat1) * math.cos(angular) + math.cos(lat1) * math.sin(angular) * math.cos(theta))
+    lon2 = lon1 + math.atan2(
+        math.sin(theta) * math.sin(angular) * math.cos(lat1), math.cos(angular) - math.sin(lat1) * math.sin(lat2)
+    )
+    longitude = (math.degrees(lon2) + 180) % 360 - 180
+    return Coordinate(longitude=longitude, latitude=math.degrees(lat2))